@@ -2,154 +2,204 @@ import pandas as pd
 import numpy as np
 from typing import Dict, Any, List
 import io
+import os
+from backend import cache, insights, model_registry, profiles, segmentation, storage, tables
 
-# In-memory storage for uploaded datasets (for simplicity as per requirements)
-DATASETS: Dict[str, pd.DataFrame] = {}
+# Uploaded datasets, versioned and held under a memory budget (cold ones spill to disk)
+DATASETS = storage.DatasetStore()
+COMPACT_DATASETS = os.environ.get("INSIGHTIFY_COMPACT_DATASETS", "1") == "1"
+
+def dataset_version(name: str) -> int:
+    """Bumped whenever a dataset is replaced; part of every cached result key."""
+    return DATASETS.version(name)
 
 def load_dataset(name: str, file_content: bytes) -> Dict[str, Any]:
     """Loads a CSV dataset into memory and returns a summary."""
     try:
         df = pd.read_csv(io.BytesIO(file_content))
-        DATASETS[name] = df
+        # Profiled once here, before compaction; stats, KPIs and summaries are served from it
+        profile = profiles.build(df, name)
+        if COMPACT_DATASETS:
+            df, memory = storage.compact_with_report(df)
+        else:
+            memory = storage.memory_report(df, df)
+        # Stored with the dataset so every worker process can serve it
+        DATASETS.put(name, df, metadata={"memory": memory, "profile": profile.to_dict()})
+        cache.results.invalidate(name)
+        model_registry.invalidate(name)
         
         summary = {
             "filename": name,
-            "rows": len(df),
+            "rows": profile.rows,
             "columns": df.columns.tolist(),
-            "missing_values": df.isnull().sum().to_dict()
+            "missing_values": profile.missing_values()
         }
         return summary
     except Exception as e:
         raise ValueError(f"Error loading dataset: {str(e)}")
 
+def get_preview_frame(name: str, rows: int = 5) -> pd.DataFrame:
+    """Returns the first rows of the dataset as a frame (for columnar responses)."""
+    if name not in DATASETS:
+        raise ValueError(f"Dataset {name} not found")
+    return DATASETS[name].head(rows)
+
 def get_dataset_preview(name: str, rows: int = 5) -> List[Dict[str, Any]]:
     """Returns a preview of the dataset."""
+    # Replace NaN with None for JSON serialization
+    return get_preview_frame(name, rows).replace({np.nan: None}).to_dict(orient='records')
+
+def get_table_page(name: str, offset: int = 0, limit: int = 100, columns: List[str] = None,
+                   sort: str = None, descending: bool = False, filters: List[str] = None) -> Dict[str, Any]:
+    """Returns one page of the dataset, optionally projected, filtered and sorted.
+
+    Sort orders and filtered selections are cached per dataset version, so after the
+    first request any page costs the same as the first one.
+    """
     if name not in DATASETS:
         raise ValueError(f"Dataset {name} not found")
-    
     df = DATASETS[name]
-    # Replace NaN with None for JSON serialization
-    return df.head(rows).replace({np.nan: None}).to_dict(orient='records')
+    version = dataset_version(name)
+    parsed = tuple(tables.parse_filter(spec) for spec in filters or [])
+    if columns:
+        tables.check_columns(df, columns)
 
-def get_summary_statistics(name: str) -> Dict[str, Any]:
-    """Returns summary statistics for numerical columns."""
+    def selection():
+        order = None
+        if sort is not None:
+            order = cache.results.get_or_compute((name, version, "sort_index", sort, descending),
+                                                 lambda: tables.sort_index(df, sort, descending))
+        return tables.select(df, order, tables.filter_mask(df, list(parsed)) if parsed else None)
+
+    positions = selection() if not parsed else cache.results.get_or_compute(
+        (name, version, "selection", sort, descending, parsed), selection)
+    rows, total = tables.page(df, positions, offset, limit, columns or None)
+    next_offset = offset + len(rows)
+    return {"rows": rows, "total": total, "offset": offset,
+            "next_offset": next_offset if next_offset < total else None}
+
+def get_memory_report(name: str) -> Dict[str, Any]:
+    """Returns the memory usage of the dataset before and after compaction."""
     if name not in DATASETS:
         raise ValueError(f"Dataset {name} not found")
-        
-    df = DATASETS[name]
-    return df.describe().to_dict()
+    return DATASETS.metadata(name).get("memory", {})
 
-def calculate_kpis(name: str) -> Dict[str, Any]:
-    """Calculates KPIs based on the dataset type."""
+def get_profile(name: str) -> profiles.DatasetProfile:
+    """Returns the profile computed when the dataset was loaded."""
     if name not in DATASETS:
         raise ValueError(f"Dataset {name} not found")
-    
-    df = DATASETS[name]
+    return profiles.DatasetProfile.from_dict(DATASETS.metadata(name)["profile"])
+
+def get_summary_statistics(name: str) -> Dict[str, Any]:
+    """Returns summary statistics for numerical columns."""
+    return get_profile(name).describe()
+
+def get_percentiles(name: str, qs: List[float], columns: List[str] = None) -> Dict[str, Any]:
+    """Returns percentiles of numeric columns from the load-time quantile sketches."""
+    if not qs or any(not 0 <= q <= 1 for q in qs):
+        raise KeyError("q must be between 0 and 1")
+    profile = get_profile(name)
+    numeric = {col: column for col, column in profile.columns.items() if column.numeric and not column.derived}
+    missing = [col for col in columns or [] if col not in numeric]
+    if missing:
+        raise KeyError(f"Not numeric columns of {name}: {', '.join(missing)}")
+    return {
+        col: {"values": {str(q): (None if np.isnan(v) else float(v)) for q, v in zip(qs, numeric[col].sketch.quantiles(qs))},
+              "rank_error": numeric[col].sketch.rank_error}
+        for col in (columns or numeric)
+    }
+
+def calculate_kpis(name: str) -> Dict[str, Any]:
+    """Calculates KPIs based on the dataset type."""
+    profile = get_profile(name)
     kpis = {}
     
     if name == "youtube":
-        kpis["total_views"] = int(df["views"].sum())
-        kpis["avg_engagement_rate"] = float(((df["likes"] + df["comments"]) / df["views"]).mean())
-        kpis["top_category"] = df["category"].mode()[0]
+        kpis["total_views"] = int(profile.column("views").sum)
+        kpis["avg_engagement_rate"] = float(profile.column("engagement_rate").mean)
+        kpis["top_category"] = profile.column("category").mode()
         
     elif name == "ads":
-        kpis["total_impressions"] = int(df["impressions"].sum())
-        kpis["avg_ctr"] = float((df["clicks"] / df["impressions"]).mean())
-        kpis["avg_conversion_rate"] = float((df["conversions"] / df["clicks"]).mean())
-        kpis["total_cost"] = float(df["cost"].sum())
+        kpis["total_impressions"] = int(profile.column("impressions").sum)
+        kpis["avg_ctr"] = float(profile.column("ctr").mean)
+        kpis["avg_conversion_rate"] = float(profile.column("conversion_rate").mean)
+        kpis["total_cost"] = float(profile.column("cost").sum)
         
     elif name == "banking":
-        kpis["avg_balance"] = float(df["account_balance"].mean())
-        kpis["churn_rate"] = float(df["churn_flag"].mean())
-        kpis["avg_products"] = float(df["products_used"].mean())
+        kpis["avg_balance"] = float(profile.column("account_balance").mean)
+        kpis["churn_rate"] = float(profile.column("churn_flag").mean)
+        kpis["avg_products"] = float(profile.column("products_used").mean)
         
     return kpis
 
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
+def perform_segmentation(name: str, n_clusters: int = 3, mode: str = "auto",
+                         columnar_points: bool = False) -> Dict[str, Any]:
+    """Performs K-Means segmentation on the dataset.
 
-def perform_segmentation(name: str, n_clusters: int = 3) -> Dict[str, Any]:
-    """Performs K-Means segmentation on the dataset."""
+    mode is "exact" (full-batch KMeans and PCA), "fast" (KMeans and PCA fitted
+    on a sample) or "auto" (fast above the configured row threshold).
+    columnar_points returns the sample points as arrays (see SegmentationPipeline.summarize).
+    """
     if name not in DATASETS:
         raise ValueError(f"Dataset {name} not found")
-        
-    df = DATASETS[name].copy()
-    features = []
-    
-    if name == "youtube":
-        features = ["views", "likes", "watch_time_minutes"]
-    elif name == "ads":
-        features = ["impressions", "clicks", "cost"]
-    elif name == "banking":
-        features = ["account_balance", "transaction_count", "products_used"]
-    else:
+
+    features = segmentation.SEGMENTATION_FEATURES.get(name)
+    if features is None:
         return {"error": "Segmentation not supported for this dataset"}
-        
-    # Drop rows with missing values in features
-    df_clean = df[features].dropna()
-    
-    scaler = StandardScaler()
-    scaled_data = scaler.fit_transform(df_clean)
-    
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    clusters = kmeans.fit_predict(scaled_data)
-    
-    df_clean["cluster"] = clusters
-    
-    # PCA for visualization (2D)
-    pca = PCA(n_components=2)
-    pca_components = pca.fit_transform(scaled_data)
-    df_clean["x"] = pca_components[:, 0]
-    df_clean["y"] = pca_components[:, 1]
-    
-    # Analyze clusters
-    cluster_summary = []
-    for i in range(n_clusters):
-        cluster_data = df_clean[df_clean["cluster"] == i]
-        summary = {
-            "cluster_id": int(i),
-            "size": int(len(cluster_data)),
-            "features": cluster_data[features].mean().to_dict(),
-            # Sample points for visualization (limit to 50 per cluster to keep payload small)
-            "points": cluster_data[["x", "y"]].head(50).to_dict(orient="records")
-        }
-        cluster_summary.append(summary)
-        
-    return {"clusters": cluster_summary}
 
-def generate_insights(name: str) -> List[Dict[str, str]]:
-    """Generates rule-based insights."""
+    # Only the feature columns are materialized; the dataset itself is not copied
+    values = segmentation.feature_matrix(DATASETS[name], features)
+    return get_segmentation_model(name, n_clusters, mode, values).summarize(values, columnar_points)
+
+def get_segmentation_model(name: str, n_clusters: int = 3, mode: str = "auto",
+                           values: np.ndarray = None) -> segmentation.SegmentationPipeline:
+    """Returns the fitted pipeline for the current dataset version from the model registry."""
     if name not in DATASETS:
         raise ValueError(f"Dataset {name} not found")
-        
-    df = DATASETS[name]
-    insights = []
-    
-    if name == "youtube":
-        avg_views = df["views"].mean()
-        high_views = df[df["views"] > avg_views]
-        if high_views["watch_time_minutes"].mean() < 10:
-            insights.append({"category": "Content Strategy", "insight": "High engagement videos tend to be under 10 minutes.", "impact": "High"})
-        
-        most_popular = df["category"].mode()[0]
-        insights.append({"category": "Trend", "insight": f"The most popular category is {most_popular}.", "impact": "Medium"})
+    features = segmentation.SEGMENTATION_FEATURES.get(name)
+    if features is None:
+        raise ValueError("Segmentation not supported for this dataset")
 
-    elif name == "ads":
-        high_cost = df[df["cost"] > df["cost"].quantile(0.75)]
-        low_conv = high_cost[high_cost["conversions"] < high_cost["conversions"].quantile(0.25)]
-        if not low_conv.empty:
-             insights.append({"category": "Optimization", "insight": "Certain ad campaigns have high cost but low conversion.", "impact": "High"})
-             
-        avg_ctr = (df["clicks"] / df["impressions"]).mean()
-        insights.append({"category": "Performance", "insight": f"Average CTR is {avg_ctr:.2%}. Campaigns below this need optimization.", "impact": "Medium"})
+    if values is None:
+        values = segmentation.feature_matrix(DATASETS[name], features)
+    resolved = segmentation.resolve_mode(mode, len(values))
+    return model_registry.get_or_fit(
+        name, dataset_version(name), features, n_clusters, resolved,
+        lambda: segmentation.SegmentationPipeline.fit(values, features, n_clusters, resolved),
+        persist=DATASETS.shared_dir is not None)
 
-    elif name == "banking":
-        churners = df[df["churn_flag"] == 1]
-        if churners["products_used"].mean() < df["products_used"].mean():
-            insights.append({"category": "Retention", "insight": "Customers with fewer products show higher churn.", "impact": "High"})
-            
-        if churners["account_balance"].mean() < df["account_balance"].mean():
-             insights.append({"category": "Risk", "insight": "Lower account balances are correlated with higher churn risk.", "impact": "Medium"})
-             
-    return insights
+def sweep_segmentation(name: str, k_min: int = 2, k_max: int = 8, mode: str = "auto") -> Dict[str, Any]:
+    """Fits a range of k in parallel and returns per-k scores plus the recommended k's clusters."""
+    if name not in DATASETS:
+        raise ValueError(f"Dataset {name} not found")
+    features = segmentation.SEGMENTATION_FEATURES.get(name)
+    if features is None:
+        raise ValueError("Segmentation not supported for this dataset")
+
+    values = segmentation.feature_matrix(DATASETS[name], features)
+    result, pipeline = segmentation.sweep(values, features, k_min, k_max, mode)
+    # Register the winner so segmentation and assign calls for that k reuse it
+    model_registry.get_or_fit(name, dataset_version(name), features, pipeline.n_clusters, pipeline.mode,
+                              lambda: pipeline, persist=DATASETS.shared_dir is not None)
+    result["summary"] = pipeline.summarize(values)
+    return result
+
+def assign_segments(name: str, records: List[Dict[str, Any]], n_clusters: int = 3,
+                    mode: str = "auto") -> List[Dict[str, Any]]:
+    """Assigns new records to the clusters of the stored model without refitting."""
+    features = segmentation.SEGMENTATION_FEATURES.get(name, [])
+    missing = [f for f in features if any(f not in record for record in records)]
+    if missing:
+        raise KeyError(f"Records are missing features: {', '.join(missing)}")
+
+    model = get_segmentation_model(name, n_clusters, mode)
+
+    values = np.array([[record[f] for f in model.features] for record in records], dtype=np.float64)
+    labels, coords = model.assign(values)
+    return [{"cluster_id": int(label), "x": float(x), "y": float(y)} for label, (x, y) in zip(labels, coords)]
+
+def generate_insights(name: str) -> List[Dict[str, str]]:
+    """Generates rule-based insights from the built-in rules plus any user thresholds for this dataset."""
+    if name not in DATASETS:
+        raise ValueError(f"Dataset {name} not found")
+    return insights.generate(DATASETS[name], insights.rules_for(name), get_profile(name))
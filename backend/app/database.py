@@ -12,6 +12,24 @@ def init_db():
                   created_at TIMESTAMP, rows_processed INTEGER, rows_errored INTEGER, errors TEXT)''')
     c.execute('''CREATE TABLE IF NOT EXISTS thresholds
                  (id TEXT PRIMARY KEY, kpi_name TEXT, operator TEXT, value REAL)''')
+    # Manifest of the partitioned Parquet dataset written by ingest (see services/catalog.py)
+    c.execute('''CREATE TABLE IF NOT EXISTS dataset_files
+                 (path TEXT PRIMARY KEY, import_id TEXT, source TEXT, month TEXT,
+                  min_date TEXT, max_date TEXT, row_count INTEGER, created_at TIMESTAMP)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_dataset_files_dates ON dataset_files (max_date, min_date)''')
+    # Daily rollups maintained incrementally by ingest (see services/rollups.py)
+    c.execute('''CREATE TABLE IF NOT EXISTS daily_revenue
+                 (day TEXT, source TEXT, revenue REAL, row_count INTEGER, PRIMARY KEY (day, source))''')
+    c.execute('''CREATE TABLE IF NOT EXISTS daily_users
+                 (day TEXT, source TEXT, user_id TEXT, PRIMARY KEY (day, source, user_id)) WITHOUT ROWID''')
+    c.execute('''CREATE TABLE IF NOT EXISTS daily_user_sketches
+                 (day TEXT, source TEXT, precision INTEGER, registers BLOB, PRIMARY KEY (day, source))''')
+    c.execute('''CREATE TABLE IF NOT EXISTS daily_amount_sketches
+                 (day TEXT, source TEXT, sketch BLOB, PRIMARY KEY (day, source))''')
+    # Thresholds breached after an import (see services/alerts.py)
+    c.execute('''CREATE TABLE IF NOT EXISTS alerts
+                 (id TEXT PRIMARY KEY, threshold_id TEXT, import_id TEXT, kpi_name TEXT, operator TEXT,
+                  threshold REAL, value REAL, created_at TIMESTAMP)''')
     conn.commit()
     conn.close()
 
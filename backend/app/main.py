@@ -1,7 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from backend.app.routers import upload, kpis, data_health
+from backend.app.routers import upload, imports, kpis, data_health, alerts
+from backend.app.services import catalog, ingest, jobs, rollups
 from backend.app.database import init_db
+from backend import cache
 import os
 
 app = FastAPI(title="Insightify API", description="Friendly Analytics API")
@@ -18,12 +20,25 @@ app.add_middleware(
 @app.on_event("startup")
 def on_startup():
     init_db()
-    os.makedirs("backend/data", exist_ok=True)
+    os.makedirs(ingest.DATA_DIR, exist_ok=True)
+    ingest.migrate_flat_files()
+    if catalog.has_data() and not rollups.has_data():
+        rollups.rebuild()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    jobs.shutdown()
 
 app.include_router(upload.router, prefix="/api", tags=["Upload"])
+app.include_router(imports.router, prefix="/api", tags=["Imports"])
 app.include_router(kpis.router, prefix="/api", tags=["KPIs"])
 app.include_router(data_health.router, prefix="/api", tags=["Data Health"])
+app.include_router(alerts.router, prefix="/api", tags=["Alerts"])
 
 @app.get("/")
 def root():
     return {"message": "Insightify Friendly API is running"}
+
+@app.get("/api/cache/stats", tags=["Cache"])
+def cache_stats():
+    return cache.results.stats()
@@ -10,12 +10,24 @@ class KPI(BaseModel):
     change_pct: float
     trend_label: str
     next_step: str
+    # For counted KPIs: "exact" or "approximate", with the relative standard error when approximate
+    mode: Optional[str] = None
+    relative_error: Optional[float] = None
 
 class KPISummary(BaseModel):
     period_days: int
     kpis: List[KPI]
     generated_at: datetime
 
+class Percentiles(BaseModel):
+    period_days: int
+    source: Optional[str] = None
+    # Quantile (as a string, e.g. "0.5") -> amount; None when the period has no amounts
+    values: Dict[str, Optional[float]]
+    # Worst-case error of each value expressed as a fraction of the rank (0 when exact)
+    rank_error: float
+    generated_at: datetime
+
 class DataHealth(BaseModel):
     last_imported_at: Optional[datetime]
     rows_processed: int
@@ -32,6 +44,24 @@ class ImportJob(BaseModel):
     rows_errored: int = 0
     errors: List[str] = []
 
+class ThresholdCreate(BaseModel):
+    kpi_name: str
+    operator: str
+    value: float
+
+class Threshold(ThresholdCreate):
+    id: str
+
+class Alert(BaseModel):
+    id: str
+    threshold_id: str
+    import_id: str
+    kpi_name: str
+    operator: str
+    threshold: float
+    value: float
+    created_at: datetime
+
 class InsightOneClickAction(BaseModel):
     type: str
     payload: Dict[str, Any]
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException, Query
+from backend.app.services import alerts
+from backend.app.models import Alert, Threshold, ThresholdCreate
+from typing import List, Optional
+
+router = APIRouter()
+
+@router.get("/alerts", response_model=List[Alert])
+async def list_alerts(limit: int = Query(50, ge=1, le=500), kpi_name: Optional[str] = None):
+    return alerts.list_alerts(limit=limit, kpi_name=kpi_name)
+
+@router.get("/thresholds", response_model=List[Threshold])
+async def list_thresholds():
+    return alerts.list_thresholds()
+
+@router.post("/thresholds", response_model=Threshold, status_code=201)
+async def create_threshold(threshold: ThresholdCreate):
+    try:
+        return alerts.create_threshold(threshold.kpi_name, threshold.operator, threshold.value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/thresholds/{threshold_id}", status_code=204)
+async def delete_threshold(threshold_id: str):
+    if not alerts.delete_threshold(threshold_id):
+        raise HTTPException(status_code=404, detail=f"Threshold {threshold_id} not found")
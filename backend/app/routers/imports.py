@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException, Query
+from backend.app.services import jobs
+from backend.app.models import ImportJob
+from typing import List, Optional
+
+router = APIRouter()
+
+@router.get("/imports", response_model=List[ImportJob])
+async def list_imports(limit: int = Query(50, ge=1, le=500), status: Optional[str] = None):
+    return jobs.list_jobs(limit=limit, status=status)
+
+@router.get("/imports/{job_id}", response_model=ImportJob)
+async def get_import(job_id: str):
+    job = jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Import {job_id} not found")
+    return job
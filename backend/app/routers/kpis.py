@@ -1,9 +1,30 @@
-from fastapi import APIRouter, Query
-from backend.app.services import kpis
-from backend.app.models import KPISummary
+from fastapi import APIRouter, HTTPException, Query
+from backend.app.services import catalog, kpis
+from backend import cache
+from datetime import date
+from backend.app.models import KPISummary, Percentiles
+from typing import List, Optional
 
 router = APIRouter()
 
 @router.get("/kpis", response_model=KPISummary)
-async def get_kpis(period: int = Query(30, description="Period in days")):
-    return kpis.compute_kpis(period_days=period)
+async def get_kpis(period: int = Query(30, description="Period in days"),
+                   mode: str = Query("auto", description="Distinct counting: auto, exact or approx")):
+    try:
+        # KPI windows are whole days, so results only change with new data or a new day
+        return cache.results.get_or_compute(
+            ("api_kpis", catalog.version(), date.today(), period, mode),
+            lambda: kpis.compute_kpis(period_days=period, mode=mode))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/percentiles", response_model=Percentiles)
+async def get_percentiles(q: List[float] = Query([0.25, 0.5, 0.75], description="Quantiles between 0 and 1"),
+                          period: int = Query(30, description="Period in days"),
+                          source: Optional[str] = None):
+    try:
+        return cache.results.get_or_compute(
+            ("api_kpis", catalog.version(), date.today(), "percentiles", tuple(q), period, source),
+            lambda: kpis.amount_percentiles(q, period_days=period, source=source))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,21 +1,17 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from backend.app.services import ingest
+from starlette.concurrency import run_in_threadpool
+from backend.app.services import ingest, jobs
 from backend.app.models import ImportJob
-from datetime import datetime
 
 router = APIRouter()
 
-@router.post("/upload", response_model=ImportJob)
+@router.post("/upload", response_model=ImportJob, status_code=202)
 async def upload_csv(file: UploadFile = File(...)):
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Only CSV files are allowed")
     
-    content = await file.read()
-    job_id = ingest.process_upload(content, file.filename)
-    
-    return ImportJob(
-        id=job_id,
-        filename=file.filename,
-        status="processing",
-        created_at=datetime.now()
-    )
+    # Spool to disk off the event loop, then hand the file to the import worker pool.
+    # Poll GET /api/imports/{id} for progress.
+    path = await run_in_threadpool(ingest.spool_to_disk, file.file, jobs.upload_dir())
+    job_id = jobs.submit_import(path, file.filename)
+    return jobs.get_job(job_id)
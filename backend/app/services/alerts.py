@@ -0,0 +1,98 @@
+import os
+import uuid
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from backend.app.database import get_db
+from backend.app.services import kpis
+
+# Thresholds name a KPI id ("revenue", "active_customers") or its change ("revenue.change_pct")
+ALERT_PERIOD_DAYS = int(os.environ.get("INSIGHTIFY_ALERT_PERIOD_DAYS", "30"))
+OPERATORS = {
+    "<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+    "==": np.equal, "!=": np.not_equal,
+}
+
+def kpi_values(period_days: int = ALERT_PERIOD_DAYS) -> Dict[str, float]:
+    """Current KPI values by threshold name, from one rollup-based KPI evaluation."""
+    values = {}
+    for kpi in kpis.compute_kpis(period_days=period_days).kpis:
+        values[kpi.id] = float(kpi.value)
+        values[f"{kpi.id}.change_pct"] = float(kpi.change_pct)
+    return values
+
+def _affects_window(conn, import_id: str, period_days: int) -> bool:
+    # An import whose rows all predate both KPI windows cannot change any KPI value
+    row = conn.execute("SELECT MAX(max_date) FROM dataset_files WHERE import_id = ?", (import_id,)).fetchone()
+    if row[0] is None:
+        return False
+    return datetime.fromisoformat(row[0]) >= datetime.now() - timedelta(days=2 * period_days)
+
+def evaluate(values: Dict[str, float], thresholds: pd.DataFrame) -> pd.DataFrame:
+    """Returns the thresholds breached by values, with the KPI value in a "kpi_value" column.
+
+    Each KPI value is looked up once and all thresholds sharing an operator are compared in one
+    vectorized step, so the cost grows with the number of thresholds only through array operations.
+    """
+    thresholds = thresholds.assign(kpi_value=thresholds["kpi_name"].map(values).astype("float64"))
+    fired = np.zeros(len(thresholds), dtype=bool)
+    for op, compare in OPERATORS.items():
+        selected = (thresholds["operator"] == op).to_numpy()
+        if selected.any():
+            fired[selected] = compare(thresholds["kpi_value"].to_numpy()[selected],
+                                      thresholds["value"].to_numpy(dtype=np.float64)[selected])
+    # Unknown KPI names compare as NaN and never fire
+    return thresholds[fired]
+
+def evaluate_import(import_id: str, period_days: int = ALERT_PERIOD_DAYS) -> int:
+    """Checks every threshold against the KPIs after an import completed and records firings."""
+    conn = get_db()
+    try:
+        thresholds = pd.read_sql_query("SELECT id, kpi_name, operator, value FROM thresholds", conn)
+        if thresholds.empty or not _affects_window(conn, import_id, period_days):
+            return 0
+        fired = evaluate(kpi_values(period_days), thresholds)
+        now = datetime.now().isoformat()
+        conn.executemany(
+            "INSERT INTO alerts (id, threshold_id, import_id, kpi_name, operator, threshold, value, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(str(uuid.uuid4()), row.id, import_id, row.kpi_name, row.operator, float(row.value), float(row.kpi_value), now)
+             for row in fired.itertuples(index=False)])
+        conn.commit()
+        return len(fired)
+    finally:
+        conn.close()
+
+def list_alerts(limit: int = 50, kpi_name: Optional[str] = None) -> List[dict]:
+    conn = get_db()
+    query = "SELECT * FROM alerts"
+    params = []
+    if kpi_name is not None:
+        query += " WHERE kpi_name = ?"
+        params.append(kpi_name)
+    rows = conn.execute(query + " ORDER BY created_at DESC LIMIT ?", params + [limit]).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+def list_thresholds() -> List[dict]:
+    conn = get_db()
+    rows = conn.execute("SELECT id, kpi_name, operator, value FROM thresholds ORDER BY rowid").fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+def create_threshold(kpi_name: str, operator: str, value: float) -> dict:
+    if operator not in OPERATORS:
+        raise ValueError(f"operator must be one of {', '.join(OPERATORS)}")
+    threshold = {"id": str(uuid.uuid4()), "kpi_name": kpi_name, "operator": operator, "value": value}
+    conn = get_db()
+    conn.execute("INSERT INTO thresholds (id, kpi_name, operator, value) VALUES (:id, :kpi_name, :operator, :value)", threshold)
+    conn.commit()
+    conn.close()
+    return threshold
+
+def delete_threshold(threshold_id: str) -> bool:
+    conn = get_db()
+    deleted = conn.execute("DELETE FROM thresholds WHERE id = ?", (threshold_id,)).rowcount
+    conn.commit()
+    conn.close()
+    return deleted > 0
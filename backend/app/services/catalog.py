@@ -0,0 +1,141 @@
+import os
+import re
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from backend.app.database import get_db
+
+# Imported rows are laid out as <root>/source=<source>/month=<YYYY-MM>/<import_id>.parquet.
+# The dataset_files table is the manifest: a file is only visible to queries once it is listed there.
+
+def _partition_value(value) -> str:
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return "unknown"
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", str(value)) or "unknown"
+
+def parse_dates(chunk: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """Parses the date column once at ingest; returns the valid rows and the number dropped."""
+    chunk = chunk.assign(date=pd.to_datetime(chunk["date"], errors="coerce"))
+    invalid = int(chunk["date"].isna().sum())
+    if invalid:
+        chunk = chunk[chunk["date"].notna()]
+    return chunk, invalid
+
+class PartitionedWriter:
+    """Appends DataFrame chunks of one import to per-(source, month) Parquet files."""
+
+    def __init__(self, import_id: str, root: str):
+        self.import_id = import_id
+        self.root = root
+        self.schema: Optional[pa.Schema] = None
+        self._writers: Dict[Tuple[str, str], pq.ParquetWriter] = {}
+        self._stats: Dict[Tuple[str, str], Dict] = {}
+
+    def _path(self, key: Tuple[str, str]) -> str:
+        source, month = key
+        return os.path.join(self.root, f"source={source}", f"month={month}", f"{self.import_id}.parquet")
+
+    def write(self, chunk: pd.DataFrame):
+        """Writes a chunk whose date column was already parsed by parse_dates."""
+        if chunk.empty:
+            return
+
+        # Sorting by date keeps row-group min/max statistics tight for pruning
+        chunk = chunk.sort_values("date", kind="stable")
+        months = chunk["date"].to_numpy().astype("datetime64[M]")
+        for (source, month), part in chunk.groupby([chunk["source"], months], sort=False, dropna=False):
+            key = (_partition_value(source), str(month)[:7])
+            table = pa.Table.from_pandas(part, preserve_index=False)
+            if self.schema is None:
+                self.schema = table.schema
+            elif not table.schema.equals(self.schema):
+                table = table.cast(self.schema)
+
+            writer = self._writers.get(key)
+            if writer is None:
+                os.makedirs(os.path.dirname(self._path(key)), exist_ok=True)
+                writer = pq.ParquetWriter(self._path(key) + ".part", self.schema)
+                self._writers[key] = writer
+                self._stats[key] = {"rows": 0, "min": None, "max": None}
+            writer.write_table(table)
+
+            stats = self._stats[key]
+            lo, hi = part["date"].iloc[0], part["date"].iloc[-1]
+            stats["rows"] += len(part)
+            stats["min"] = lo if stats["min"] is None else min(stats["min"], lo)
+            stats["max"] = hi if stats["max"] is None else max(stats["max"], hi)
+
+    def commit(self, conn) -> int:
+        """Finalizes the files and adds them to the manifest in the caller's transaction."""
+        now = datetime.now().isoformat()
+        entries = []
+        for key, writer in self._writers.items():
+            writer.close()
+            path = self._path(key)
+            os.replace(path + ".part", path)
+            stats = self._stats[key]
+            entries.append((path, self.import_id, key[0], key[1], stats["min"].isoformat(),
+                            stats["max"].isoformat(), stats["rows"], now))
+        self._writers.clear()
+        conn.executemany("INSERT OR REPLACE INTO dataset_files (path, import_id, source, month, min_date, max_date, row_count, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", entries)
+        return len(entries)
+
+    def abort(self):
+        for key, writer in self._writers.items():
+            writer.close()
+            if os.path.exists(self._path(key) + ".part"):
+                os.remove(self._path(key) + ".part")
+        self._writers.clear()
+
+def has_data() -> bool:
+    conn = get_db()
+    row = conn.execute("SELECT 1 FROM dataset_files LIMIT 1").fetchone()
+    conn.close()
+    return row is not None
+
+def version() -> tuple:
+    """Cheap change token for the dataset; changes whenever an import adds files."""
+    conn = get_db()
+    row = conn.execute("SELECT COALESCE(MAX(rowid), 0), COUNT(*) FROM dataset_files").fetchone()
+    conn.close()
+    return tuple(row)
+
+def list_files(start: Optional[datetime] = None, end: Optional[datetime] = None,
+               sources: Optional[List[str]] = None) -> List[Dict]:
+    """Returns manifest entries whose date range overlaps [start, end]."""
+    query = "SELECT * FROM dataset_files WHERE 1=1"
+    params: list = []
+    if start is not None:
+        query += " AND max_date >= ?"
+        params.append(start.isoformat())
+    if end is not None:
+        query += " AND min_date <= ?"
+        params.append(end.isoformat())
+    if sources:
+        query += f" AND source IN ({', '.join('?' for _ in sources)})"
+        params.extend(_partition_value(s) for s in sources)
+    conn = get_db()
+    rows = conn.execute(query + " ORDER BY min_date", params).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+def scan(start: Optional[datetime] = None, end: Optional[datetime] = None,
+         columns: Optional[List[str]] = None, sources: Optional[List[str]] = None) -> pd.DataFrame:
+    """Reads rows with start <= date <= end, touching only overlapping files and row groups."""
+    filters = []
+    if start is not None:
+        filters.append(("date", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("date", "<=", pd.Timestamp(end)))
+
+    frames = []
+    for entry in list_files(start, end, sources):
+        table = pq.read_table(entry["path"], columns=columns, filters=filters or None)
+        if table.num_rows:
+            frames.append(table.to_pandas())
+
+    if not frames:
+        return pd.DataFrame(columns=columns or [])
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
@@ -0,0 +1,93 @@
+import json
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional
+from backend.app.database import get_db
+from backend.app.models import ImportJob
+from backend.app.services import ingest
+
+# "thread" shares the API process; "process" isolates parsing from the GIL entirely
+EXECUTOR_KIND = os.environ.get("INSIGHTIFY_IMPORT_EXECUTOR", "thread")
+MAX_WORKERS = int(os.environ.get("INSIGHTIFY_IMPORT_WORKERS", "2"))
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> Executor:
+    """Returns the shared import worker pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            if EXECUTOR_KIND == "process":
+                _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+            elif EXECUTOR_KIND == "thread":
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="import")
+            else:
+                raise ValueError(f"Unknown import executor: {EXECUTOR_KIND}")
+        return _executor
+
+def shutdown(wait: bool = True):
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+
+def upload_dir() -> str:
+    path = os.path.join(ingest.DATA_DIR, "uploads")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def submit_import(path: str, filename: str) -> str:
+    """Queues a spooled CSV file for import and returns the job id immediately."""
+    job_id = ingest.create_import(filename)
+    try:
+        future = get_executor().submit(ingest.run_import, job_id, path, ingest.CHUNK_ROWS, True)
+    except Exception as e:
+        _mark_failed(job_id, e)
+        os.remove(path)
+        raise
+    # run_import records its own failures; this only catches crashed workers
+    future.add_done_callback(lambda f: _on_done(job_id, f))
+    return job_id
+
+def _on_done(job_id: str, future: Future):
+    if future.cancelled():
+        _mark_failed(job_id, "Import was cancelled")
+    elif future.exception() is not None:
+        _mark_failed(job_id, future.exception())
+
+def _mark_failed(job_id: str, error):
+    conn = get_db()
+    conn.execute("UPDATE imports SET status=?, errors=? WHERE id=?", ("failed", json.dumps([str(error)]), job_id))
+    conn.commit()
+    conn.close()
+
+def _row_to_job(row) -> ImportJob:
+    created_at = row['created_at']
+    return ImportJob(
+        id=row['id'],
+        filename=row['filename'],
+        status=row['status'],
+        created_at=datetime.fromisoformat(created_at) if isinstance(created_at, str) else created_at,
+        rows_processed=row['rows_processed'] or 0,
+        rows_errored=row['rows_errored'] or 0,
+        errors=json.loads(row['errors'] or "[]")
+    )
+
+def get_job(job_id: str) -> Optional[ImportJob]:
+    conn = get_db()
+    row = conn.execute("SELECT * FROM imports WHERE id=?", (job_id,)).fetchone()
+    conn.close()
+    return _row_to_job(row) if row else None
+
+def list_jobs(limit: int = 50, status: Optional[str] = None) -> List[ImportJob]:
+    conn = get_db()
+    if status:
+        rows = conn.execute("SELECT * FROM imports WHERE status=? ORDER BY created_at DESC LIMIT ?", (status, limit)).fetchall()
+    else:
+        rows = conn.execute("SELECT * FROM imports ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+    conn.close()
+    return [_row_to_job(row) for row in rows]
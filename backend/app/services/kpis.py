@@ -1,39 +1,103 @@
+import os
 import pandas as pd
 from datetime import datetime, timedelta
-from backend.app.models import KPI, KPISummary
-import glob
-import os
+from backend.app.models import KPI, KPISummary, Percentiles
+from typing import List, Optional
+from backend.app.services import catalog, rollups
 
-def load_all_data():
-    # Load all parquet files from ingestion
-    files = glob.glob("backend/data/*.parquet")
-    if not files:
-        return pd.DataFrame(columns=["date", "user_id", "amount", "source", "views", "likes", "comments", "clicks", "impressions", "cost"])
-    
-    dfs = []
-    for f in files:
-        try:
-            dfs.append(pd.read_parquet(f))
-        except:
-            pass
-    
-    if not dfs:
-        return pd.DataFrame()
-        
-    df = pd.concat(dfs, ignore_index=True)
-    if 'date' in df.columns:
-        df['date'] = pd.to_datetime(df['date'])
-    return df
-
-def compute_kpis(period_days: int = 30) -> KPISummary:
-    df = load_all_data()
-    
-    if df.empty:
+KPI_COLUMNS = ["date", "user_id", "amount", "source"]
+
+# In "auto" mode, windows with more rows than this use HyperLogLog sketches for distinct counts
+APPROX_MIN_ROWS = int(os.environ.get("INSIGHTIFY_APPROX_MIN_ROWS", "1000000"))
+COUNT_MODES = ("auto", "exact", "approx")
+
+def load_all_data(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  columns: Optional[List[str]] = None) -> pd.DataFrame:
+    # Only partitions overlapping [start, end] are read, and only the requested columns.
+    # Dates are stored as timestamps at ingest, so no re-parsing is needed here.
+    return catalog.scan(start, end, columns=columns)
+
+def _revenue_kpi(period_days: int, revenue_curr: float, revenue_prev: float) -> KPI:
+    rev_change = ((revenue_curr - revenue_prev) / revenue_prev * 100) if revenue_prev > 0 else 0
+    return KPI(
+        id="revenue",
+        label=f"Revenue (Last {period_days} days)",
+        value=round(revenue_curr, 2),
+        unit="USD",
+        change_pct=round(rev_change, 1),
+        trend_label=f"vs previous {period_days} days",
+        next_step="If revenue fell >5%, review top 3 products."
+    )
+
+def _customers_kpi(period_days: int, cust_curr: int, cust_prev: int,
+                   relative_error: Optional[float] = None) -> KPI:
+    cust_change = ((cust_curr - cust_prev) / cust_prev * 100) if cust_prev > 0 else 0
+    return KPI(
+        id="active_customers",
+        label="Active Customers",
+        value=cust_curr,
+        unit=None,
+        change_pct=round(cust_change, 1),
+        trend_label=f"vs previous {period_days} days",
+        next_step="Run a referral campaign if growth is flat.",
+        mode="exact" if relative_error is None else "approximate",
+        relative_error=relative_error
+    )
+
+def compute_kpis(period_days: int = 30, mode: str = "auto") -> KPISummary:
+    """Answers the KPIs from the daily rollups, in time proportional to the number of days.
+
+    mode selects how active customers are counted: "exact" (distinct user sets),
+    "approx" (merged HyperLogLog sketches) or "auto" (approx above APPROX_MIN_ROWS rows).
+    """
+    if mode not in COUNT_MODES:
+        raise ValueError(f"mode must be one of {', '.join(COUNT_MODES)}")
+
+    now = datetime.now()
+    start = now - timedelta(days=period_days)
+    prev_start = start - timedelta(days=period_days)
+
+    curr_days = rollups.window_days(start, now)
+    prev_days = rollups.window_days(prev_start, start, end_inclusive=False)
+
+    row_count = rollups.row_count(prev_days[0], curr_days[1])
+    if row_count == 0:
         return KPISummary(period_days=period_days, kpis=[], generated_at=datetime.now())
 
+    kpis = [_revenue_kpi(period_days, rollups.revenue(*curr_days, source="bank"), rollups.revenue(*prev_days, source="bank"))]
+
+    if mode == "approx" or (mode == "auto" and row_count > APPROX_MIN_ROWS):
+        cust_curr, error = rollups.approx_distinct_users(*curr_days)
+        cust_prev, _ = rollups.approx_distinct_users(*prev_days)
+        kpis.append(_customers_kpi(period_days, cust_curr, cust_prev, relative_error=round(error, 4)))
+    else:
+        kpis.append(_customers_kpi(period_days, rollups.distinct_users(*curr_days), rollups.distinct_users(*prev_days)))
+
+    return KPISummary(
+        period_days=period_days,
+        kpis=kpis,
+        generated_at=datetime.now()
+    )
+
+def amount_percentiles(qs: List[float], period_days: int = 30, source: Optional[str] = None) -> Percentiles:
+    """Percentiles of amount over the last period_days, merged from the per-day sketches built at ingest."""
+    if not qs or any(not 0 <= q <= 1 for q in qs):
+        raise ValueError("q must be between 0 and 1")
+    now = datetime.now()
+    values, rank_error = rollups.amount_quantiles(*rollups.window_days(now - timedelta(days=period_days), now), qs, source=source)
+    return Percentiles(period_days=period_days, source=source, values={str(q): None if pd.isna(v) else v for q, v in zip(qs, values)},
+                       rank_error=round(rank_error, 4), generated_at=datetime.now())
+
+def compute_kpis_raw(period_days: int = 30) -> KPISummary:
+    """Computes the KPIs by scanning raw rows; the reference for the rollup path."""
     now = datetime.now()
     start = now - timedelta(days=period_days)
     prev_start = start - timedelta(days=period_days)
+
+    df = load_all_data(prev_start, now, columns=KPI_COLUMNS)
+    
+    if df.empty:
+        return KPISummary(period_days=period_days, kpis=[], generated_at=datetime.now())
     
     # Filter for current period
     dfp = df[(df['date'] >= start) & (df['date'] <= now)]
@@ -45,33 +109,11 @@ def compute_kpis(period_days: int = 30) -> KPISummary:
     # Revenue
     revenue_curr = dfp[dfp['source']=='bank']['amount'].sum() if 'amount' in dfp.columns else 0
     revenue_prev = prev[prev['source']=='bank']['amount'].sum() if 'amount' in prev.columns else 0
-    rev_change = ((revenue_curr - revenue_prev) / revenue_prev * 100) if revenue_prev > 0 else 0
-    
-    kpis.append(KPI(
-        id="revenue",
-        label=f"Revenue (Last {period_days} days)",
-        value=round(revenue_curr, 2),
-        unit="USD",
-        change_pct=round(rev_change, 1),
-        trend_label=f"vs previous {period_days} days",
-        next_step="If revenue fell >5%, review top 3 products."
-    ))
+    kpis.append(_revenue_kpi(period_days, revenue_curr, revenue_prev))
     
     # Active Customers
     if 'user_id' in dfp.columns:
-        cust_curr = dfp['user_id'].nunique()
-        cust_prev = prev['user_id'].nunique()
-        cust_change = ((cust_curr - cust_prev) / cust_prev * 100) if cust_prev > 0 else 0
-        
-        kpis.append(KPI(
-            id="active_customers",
-            label="Active Customers",
-            value=cust_curr,
-            unit=None,
-            change_pct=round(cust_change, 1),
-            trend_label=f"vs previous {period_days} days",
-            next_step="Run a referral campaign if growth is flat."
-        ))
+        kpis.append(_customers_kpi(period_days, dfp['user_id'].nunique(), prev['user_id'].nunique()))
     
     return KPISummary(
         period_days=period_days,
@@ -0,0 +1,176 @@
+import os
+import pandas as pd
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+from backend.app.database import get_db
+from backend.app.services import catalog
+from backend.sketches import KLL, HyperLogLog, merge_kll, precision_for_error
+
+# Daily rollups maintained at ingest so KPIs are answered per day instead of per row:
+#   daily_revenue(day, source) -> summed amount and row count
+#   daily_users(day, source, user_id) -> distinct users seen that day
+#   daily_user_sketches(day, source) -> HyperLogLog of the same users, merged for approximate counts
+#   daily_amount_sketches(day, source) -> KLL quantile sketch of the amounts, merged for percentiles
+
+# Relative standard error of the per-day HyperLogLog sketches; applies to newly ingested days
+HLL_ERROR = float(os.environ.get("INSIGHTIFY_HLL_ERROR", "0.01"))
+# Size parameter of the per-day amount sketches; rank error is about 1.7 / k
+AMOUNT_SKETCH_K = int(os.environ.get("INSIGHTIFY_AMOUNT_SKETCH_K", "200"))
+
+def _normalize_user_ids(user_ids: pd.Series) -> pd.Series:
+    user_ids = user_ids.dropna()
+    # A chunk with missing ids parses as float; keep "7" and "7.0" the same user
+    if pd.api.types.is_float_dtype(user_ids) and (user_ids == user_ids.round()).all():
+        user_ids = user_ids.astype("int64")
+    return user_ids.astype(str)
+
+class RollupBuilder:
+    """Accumulates the daily rollups of one import, chunk by chunk."""
+
+    def __init__(self):
+        self._revenue = []
+        self._users = []
+        self._sketches: Dict[Tuple[str, Optional[str]], HyperLogLog] = {}
+        self._amounts: Dict[Tuple[str, Optional[str]], KLL] = {}
+
+    def add(self, chunk: pd.DataFrame):
+        """Adds a chunk whose date column was already parsed by catalog.parse_dates."""
+        if chunk.empty:
+            return
+        days = pd.Series(chunk["date"].to_numpy().astype("datetime64[D]"), index=chunk.index)
+        amounts = pd.to_numeric(chunk["amount"], errors="coerce")
+        revenue = amounts.groupby([days, chunk["source"]], dropna=False).agg(["sum", "size"])
+        self._revenue.append(revenue)
+        for (day, source), group in amounts.groupby([days, chunk["source"]], dropna=False):
+            key = (str(day)[:10], None if pd.isna(source) else str(source))
+            sketch = self._amounts.get(key)
+            if sketch is None:
+                sketch = self._amounts[key] = KLL(AMOUNT_SKETCH_K)
+            sketch.add(group.to_numpy(dtype="float64", na_value=float("nan")))
+
+        user_ids = _normalize_user_ids(chunk["user_id"])
+        users = pd.DataFrame({"day": days[user_ids.index], "source": chunk["source"][user_ids.index], "user_id": user_ids})
+        users = users.drop_duplicates()
+        self._users.append(users)
+
+        for (day, source), group in users.groupby(["day", "source"], dropna=False):
+            key = (str(day)[:10], None if pd.isna(source) else str(source))
+            sketch = self._sketches.get(key)
+            if sketch is None:
+                sketch = self._sketches[key] = HyperLogLog(precision_for_error(HLL_ERROR))
+            sketch.add(group["user_id"])
+
+    def commit(self, conn):
+        """Merges the accumulated rollups into the tables in the caller's transaction."""
+        if self._revenue:
+            revenue = pd.concat(self._revenue).groupby(level=[0, 1], dropna=False).sum()
+            conn.executemany(
+                """INSERT INTO daily_revenue (day, source, revenue, row_count) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(day, source) DO UPDATE SET revenue = revenue + excluded.revenue,
+                   row_count = row_count + excluded.row_count""",
+                [(str(day)[:10], None if pd.isna(source) else str(source), float(row["sum"]), int(row["size"]))
+                 for (day, source), row in revenue.iterrows()])
+        if self._users:
+            users = pd.concat(self._users).drop_duplicates()
+            conn.executemany("INSERT OR IGNORE INTO daily_users (day, source, user_id) VALUES (?, ?, ?)",
+                             zip(users["day"].astype(str).str[:10], users["source"].astype(object).where(users["source"].notna(), None), users["user_id"]))
+        for (day, source), sketch in self._sketches.items():
+            row = conn.execute("SELECT precision, registers FROM daily_user_sketches WHERE day = ? AND source IS ?",
+                               (day, source)).fetchone()
+            if row is not None:
+                sketch.merge(HyperLogLog.from_bytes(row[0], row[1]))
+            conn.execute("DELETE FROM daily_user_sketches WHERE day = ? AND source IS ?", (day, source))
+            conn.execute("INSERT INTO daily_user_sketches (day, source, precision, registers) VALUES (?, ?, ?, ?)",
+                         (day, source, sketch.precision, sketch.to_bytes()))
+        for (day, source), sketch in self._amounts.items():
+            row = conn.execute("SELECT sketch FROM daily_amount_sketches WHERE day = ? AND source IS ?",
+                               (day, source)).fetchone()
+            if row is not None:
+                sketch.merge(KLL.from_bytes(row[0]))
+            conn.execute("DELETE FROM daily_amount_sketches WHERE day = ? AND source IS ?", (day, source))
+            conn.execute("INSERT INTO daily_amount_sketches (day, source, sketch) VALUES (?, ?, ?)",
+                         (day, source, sketch.to_bytes()))
+        self._revenue, self._users, self._sketches, self._amounts = [], [], {}, {}
+
+def has_data() -> bool:
+    """True when every rollup table is populated (databases from older versions lack the newer ones)."""
+    conn = get_db()
+    row = conn.execute("SELECT EXISTS (SELECT 1 FROM daily_revenue) AND EXISTS (SELECT 1 FROM daily_amount_sketches)").fetchone()
+    conn.close()
+    return bool(row[0])
+
+def rebuild():
+    """Recomputes the rollups from every file in the catalog (for data imported before rollups existed)."""
+    conn = get_db()
+    conn.execute("DELETE FROM daily_revenue")
+    conn.execute("DELETE FROM daily_users")
+    conn.execute("DELETE FROM daily_user_sketches")
+    conn.execute("DELETE FROM daily_amount_sketches")
+    for entry in catalog.list_files():
+        builder = RollupBuilder()
+        builder.add(pd.read_parquet(entry["path"], columns=["date", "user_id", "amount", "source"]))
+        builder.commit(conn)
+    conn.commit()
+    conn.close()
+
+def _ceil_day(ts: datetime) -> date:
+    day = ts.date()
+    return day if ts == datetime.combine(day, time.min) else day + timedelta(days=1)
+
+def window_days(start: datetime, end: datetime, end_inclusive: bool = True) -> Tuple[str, str]:
+    """Maps a timestamp window onto the inclusive range of whole days it contains.
+
+    Imported dates are day-granular (midnight), so a day belongs to the window
+    exactly when its midnight does.
+    """
+    last = end.date() if end_inclusive else _ceil_day(end) - timedelta(days=1)
+    return _ceil_day(start).isoformat(), last.isoformat()
+
+def revenue(first_day: str, last_day: str, source: Optional[str] = None) -> float:
+    conn = get_db()
+    if source is None:
+        row = conn.execute("SELECT COALESCE(SUM(revenue), 0) FROM daily_revenue WHERE day BETWEEN ? AND ?",
+                           (first_day, last_day)).fetchone()
+    else:
+        row = conn.execute("SELECT COALESCE(SUM(revenue), 0) FROM daily_revenue WHERE source = ? AND day BETWEEN ? AND ?",
+                           (source, first_day, last_day)).fetchone()
+    conn.close()
+    return row[0]
+
+def row_count(first_day: str, last_day: str) -> int:
+    conn = get_db()
+    row = conn.execute("SELECT COALESCE(SUM(row_count), 0) FROM daily_revenue WHERE day BETWEEN ? AND ?",
+                       (first_day, last_day)).fetchone()
+    conn.close()
+    return row[0]
+
+def distinct_users(first_day: str, last_day: str) -> int:
+    conn = get_db()
+    row = conn.execute("SELECT COUNT(DISTINCT user_id) FROM daily_users WHERE day BETWEEN ? AND ?",
+                       (first_day, last_day)).fetchone()
+    conn.close()
+    return row[0]
+
+def approx_distinct_users(first_day: str, last_day: str) -> Tuple[int, float]:
+    """Estimates distinct users by merging the per-day sketches; returns (estimate, relative error)."""
+    conn = get_db()
+    rows = conn.execute("SELECT precision, registers FROM daily_user_sketches WHERE day BETWEEN ? AND ?",
+                        (first_day, last_day)).fetchall()
+    conn.close()
+    merged = HyperLogLog.union(HyperLogLog.from_bytes(row[0], row[1]) for row in rows)
+    if merged is None:
+        return 0, HyperLogLog(precision_for_error(HLL_ERROR)).relative_error
+    return merged.count(), merged.relative_error
+
+def amount_quantiles(first_day: str, last_day: str, qs, source: Optional[str] = None) -> Tuple[List[float], float]:
+    """Percentiles of amount over whole days from the merged per-day sketches; returns (values, rank error)."""
+    conn = get_db()
+    if source is None:
+        rows = conn.execute("SELECT sketch FROM daily_amount_sketches WHERE day BETWEEN ? AND ?",
+                            (first_day, last_day)).fetchall()
+    else:
+        rows = conn.execute("SELECT sketch FROM daily_amount_sketches WHERE source = ? AND day BETWEEN ? AND ?",
+                            (source, first_day, last_day)).fetchall()
+    conn.close()
+    merged = merge_kll(KLL.from_bytes(row[0]) for row in rows) or KLL(AMOUNT_SKETCH_K)
+    return [float(value) for value in merged.quantiles(qs)], merged.rank_error
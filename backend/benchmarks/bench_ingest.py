@@ -0,0 +1,87 @@
+"""Peak-memory benchmark for CSV ingestion.
+
+Compares the streaming, chunked ingest path against a whole-file ``read_csv``
+for increasing file sizes. The streaming peak should stay flat while the
+whole-file peak grows with the input.
+
+Usage: python -m backend.benchmarks.bench_ingest --rows 100000 1000000
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from backend.app import database
+from backend.app.services import ingest
+
+
+def write_csv(path: str, rows: int, chunk_rows: int = 100_000):
+    """Writes a synthetic bank transactions CSV without holding it in memory."""
+    rng = np.random.default_rng(42)
+    start = np.datetime64("2025-01-01")
+    written = 0
+    with open(path, "w") as out:
+        while written < rows:
+            n = min(chunk_rows, rows - written)
+            chunk = pd.DataFrame({
+                "date": (start + rng.integers(0, 365, n)).astype(str),
+                "user_id": rng.integers(0, 1_000_000, n),
+                "amount": np.round(rng.lognormal(8, 1.5, n), 2),
+                "source": "bank",
+            })
+            chunk.to_csv(out, index=False, header=written == 0)
+            written += n
+
+
+def measure(fn):
+    """Runs fn and returns (seconds, peak bytes) across Python and Arrow allocations."""
+    pool = pa.default_memory_pool()
+    arrow_base = pool.max_memory()
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, py_peak + max(pool.max_memory() - arrow_base, 0)
+
+
+def whole_file(path: str, out_dir: str):
+    with open(path, "rb") as f:
+        content = f.read()
+    pd.read_csv(io.BytesIO(content)).to_parquet(os.path.join(out_dir, "whole.parquet"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--chunk-rows", type=int, default=ingest.CHUNK_ROWS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        database.init_db()
+        ingest.DATA_DIR = os.path.join(tmp, "data")
+
+        print(f"{'rows':>10} {'file MB':>8} {'mode':>10} {'seconds':>8} {'peak MB':>8}")
+        for rows in args.rows:
+            csv_path = os.path.join(tmp, f"input_{rows}.csv")
+            write_csv(csv_path, rows)
+            size_mb = os.path.getsize(csv_path) / 1e6
+
+            elapsed, peak = measure(lambda: ingest.process_upload_file(csv_path, "bench.csv", args.chunk_rows))
+            print(f"{rows:>10} {size_mb:>8.1f} {'streaming':>10} {elapsed:>8.2f} {peak / 1e6:>8.1f}")
+
+            elapsed, peak = measure(lambda: whole_file(csv_path, tmp))
+            print(f"{rows:>10} {size_mb:>8.1f} {'whole-file':>10} {elapsed:>8.2f} {peak / 1e6:>8.1f}")
+            os.remove(csv_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Exact vs fast segmentation: runtime and cluster quality.
+
+Fits both paths of backend.segmentation on synthetic YouTube-like data and
+reports wall time, inertia relative to the exact fit, a sampled silhouette
+score and the adjusted Rand index between the two labelings.
+
+Usage: python -m backend.benchmarks.bench_segmentation --rows 10000 100000 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.metrics import adjusted_rand_score, silhouette_score
+from sklearn.preprocessing import StandardScaler
+
+from backend import segmentation
+
+SILHOUETTE_SAMPLE = 10_000
+
+
+def synthetic_values(rows: int) -> np.ndarray:
+    rng = np.random.default_rng(42)
+    views = np.clip(rng.lognormal(10, 2, rows), 100, 5e7)
+    likes = views * rng.uniform(0.01, 0.08, rows)
+    watch_time = np.clip(rng.lognormal(2, 0.5, rows), 0.5, 120)
+    return np.column_stack([views, likes, watch_time])
+
+
+def run(scaled: np.ndarray, n_clusters: int, mode: str):
+    started = time.perf_counter()
+    kmeans = segmentation.fit_kmeans(scaled, n_clusters, mode)
+    labels = kmeans.predict(scaled)
+    segmentation.fit_pca(scaled, mode)
+    elapsed = time.perf_counter() - started
+    inertia = float(((scaled - kmeans.cluster_centers_[labels]) ** 2).sum())
+    return elapsed, labels, inertia
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--clusters", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'mode':>6} {'seconds':>8} {'inertia/exact':>14} {'silhouette':>11} {'ARI':>6}")
+    for rows in args.rows:
+        scaled = StandardScaler().fit_transform(synthetic_values(rows))
+        sample = np.random.default_rng(0).choice(rows, min(rows, SILHOUETTE_SAMPLE), replace=False)
+
+        exact_time, exact_labels, exact_inertia = run(scaled, args.clusters, "exact")
+        fast_time, fast_labels, fast_inertia = run(scaled, args.clusters, "fast")
+
+        for mode, elapsed, labels, inertia in (("exact", exact_time, exact_labels, exact_inertia),
+                                               ("fast", fast_time, fast_labels, fast_inertia)):
+            silhouette = silhouette_score(scaled[sample], labels[sample])
+            ari = adjusted_rand_score(exact_labels, labels)
+            print(f"{rows:>10} {mode:>6} {elapsed:>8.2f} {inertia / exact_inertia:>14.3f} {silhouette:>11.3f} {ari:>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+class ResultCache:
+    """Thread-safe LRU cache for computed endpoint results.
+
+    Keys are tuples whose first element is a namespace (usually the dataset
+    name) and which include the dataset version, so a new upload never
+    serves stale results even before the old entries are evicted.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key: Tuple[Hashable, ...], compute: Callable[[], Any]) -> Any:
+        hit, value = self.lookup(key)
+        if hit:
+            return value
+        # Computed outside the lock; concurrent misses on the same key may both compute
+        value = compute()
+        self.store(key, value)
+        return value
+
+    def lookup(self, key: Tuple[Hashable, ...]) -> Tuple[bool, Any]:
+        """Returns (True, value) on a hit and (False, None) on a miss, counting either."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def store(self, key: Tuple[Hashable, ...], value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, namespace: Optional[Hashable] = None):
+        """Drops every entry in a namespace, or everything when no namespace is given."""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == namespace]:
+                    del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+# Shared by both FastAPI apps when they run in the same process
+results = ResultCache(max_entries=int(os.environ.get("INSIGHTIFY_CACHE_ENTRIES", "256")))
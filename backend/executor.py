@@ -0,0 +1,111 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from backend import cache
+
+# CPU-heavy analysis (uploads, segmentation, insights, sorting) runs here instead of on the event loop.
+# "thread" shares datasets and caches with the API process; "process" sidesteps the GIL and relies on
+# the shared dataset store (storage.SHARED_DIR) to see uploads made by other workers.
+EXECUTOR_KIND = os.environ.get("INSIGHTIFY_ANALYSIS_EXECUTOR", "thread")
+MAX_WORKERS = int(os.environ.get("INSIGHTIFY_ANALYSIS_WORKERS", "4"))
+# Calls waiting for a worker beyond those running; further calls are rejected with 503
+QUEUE_LIMIT = int(os.environ.get("INSIGHTIFY_ANALYSIS_QUEUE", "16"))
+TIMEOUT_SECONDS = float(os.environ.get("INSIGHTIFY_ANALYSIS_TIMEOUT", "60"))
+RETRY_AFTER_SECONDS = int(os.environ.get("INSIGHTIFY_RETRY_AFTER", "5"))
+
+class Saturated(Exception):
+    """Raised when every worker is busy and the queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Analysis workers are busy; retry later")
+        self.retry_after = retry_after
+
+class TimedOut(Exception):
+    """Raised when a call does not finish within the request timeout (it keeps its slot until done)."""
+
+    def __init__(self, timeout: float, retry_after: int):
+        super().__init__(f"Analysis did not finish within {timeout:g}s; retry later")
+        self.retry_after = retry_after
+
+class BoundedExecutor:
+    """A worker pool that admits at most workers + queue_limit calls at a time."""
+
+    def __init__(self, kind: str = EXECUTOR_KIND, workers: int = MAX_WORKERS, queue_limit: int = QUEUE_LIMIT,
+                 timeout: float = TIMEOUT_SECONDS, retry_after: int = RETRY_AFTER_SECONDS):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown analysis executor: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="analysis")
+        return self._pool
+
+    def submit(self, fn: Callable, *args) -> Future:
+        with self._lock:
+            if self.in_flight >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise Saturated(self.retry_after)
+            self.in_flight += 1
+            try:
+                future = self._get_pool().submit(fn, *args)
+            except Exception:
+                self.in_flight -= 1
+                raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future: Future):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Runs fn(*args) on the pool and awaits it without blocking the event loop."""
+        future = self.submit(fn, *args)
+        limit = self.timeout if timeout is None else timeout
+        try:
+            # shield: a timeout abandons the wait, while the call still finishes and frees its slot
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), limit)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise TimedOut(limit, self.retry_after)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"kind": self.kind, "workers": self.workers, "queue_limit": self.queue_limit,
+                    "in_flight": self.in_flight, "completed": self.completed,
+                    "rejected": self.rejected, "timeouts": self.timeouts}
+
+pool = BoundedExecutor()
+
+async def cached(key: Tuple[Hashable, ...], fn: Callable, *args) -> Any:
+    """Serves key from the result cache, computing fn(*args) on the pool on a miss."""
+    hit, value = cache.results.lookup(key)
+    if hit:
+        return value
+    value = await pool.run(fn, *args)
+    cache.results.store(key, value)
+    return value
@@ -0,0 +1,331 @@
+import re
+import sqlite3
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+# Insight rules are data. A rule fires when `metric <operator> threshold` holds (or always, without
+# an operator); its text is formatted with the metric's value as {value}.
+#
+# Metric expressions:
+#   agg(expr)                 mean, sum, count, min, max, median, mode, nunique
+#   agg(expr | condition)     aggregate over the rows matching the condition
+#   quantile(expr, q)         also quantile(expr | condition, q)
+# where expr is a column or arithmetic on columns (clicks / impressions) and a condition is one or
+# more comparisons joined by "&", whose operands may themselves be metrics:
+#   mean(watch_time_minutes | views > mean(views))
+#
+# All rules of a dataset are evaluated together: every distinct column, filter mask and aggregate
+# is computed once and shared, so adding rules does not add scans for the parts they share.
+
+BUILTIN_RULES: Dict[str, List[Dict[str, Any]]] = {
+    "youtube": [
+        {"category": "Content Strategy", "metric": "mean(watch_time_minutes | views > mean(views))",
+         "operator": "<", "threshold": 10, "impact": "High",
+         "insight": "High engagement videos tend to be under 10 minutes."},
+        {"category": "Trend", "metric": "mode(category)", "impact": "Medium",
+         "insight": "The most popular category is {value}."},
+    ],
+    "ads": [
+        {"category": "Optimization",
+         "metric": "count(cost | cost > quantile(cost, 0.75) & conversions < quantile(conversions | cost > quantile(cost, 0.75), 0.25))",
+         "operator": ">", "threshold": 0, "impact": "High",
+         "insight": "Certain ad campaigns have high cost but low conversion."},
+        {"category": "Performance", "metric": "mean(clicks / impressions)", "impact": "Medium",
+         "insight": "Average CTR is {value:.2%}. Campaigns below this need optimization."},
+    ],
+    "banking": [
+        {"category": "Retention", "metric": "mean(products_used | churn_flag == 1)",
+         "operator": "<", "threshold": "mean(products_used)", "impact": "High",
+         "insight": "Customers with fewer products show higher churn."},
+        {"category": "Risk", "metric": "mean(account_balance | churn_flag == 1)",
+         "operator": "<", "threshold": "mean(account_balance)", "impact": "Medium",
+         "insight": "Lower account balances are correlated with higher churn risk."},
+    ],
+}
+
+AGGREGATES = {"mean", "sum", "count", "min", "max", "median", "quantile", "mode", "nunique"}
+COMPARISONS = {
+    "<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+    "==": np.equal, "!=": np.not_equal,
+}
+PROFILE_AGGREGATES = {"mean", "sum", "count", "min", "max", "median", "quantile"}
+ARITHMETIC = {"+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide}
+
+_TOKEN = re.compile(r"\s*(?:(\d+\.\d*|\.\d+|\d+)|('[^']*')|([A-Za-z_]\w*)|(<=|>=|==|!=|[()<>,|&+\-*/]))")
+
+class RuleError(ValueError):
+    pass
+
+class MissingColumn(RuleError):
+    pass
+
+def _tokenize(text: str) -> List[str]:
+    tokens, pos = [], 0
+    while pos < len(text.rstrip()):
+        match = _TOKEN.match(text, pos)
+        if not match:
+            raise RuleError(f"Unexpected input at {text[pos:]!r}")
+        tokens.append(next(group for group in match.groups() if group is not None))
+        pos = match.end()
+    return tokens
+
+class _Parser:
+    """Recursive-descent parser producing hashable tuple nodes (so equal subexpressions share a memo slot)."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self, expected: Optional[str] = None) -> str:
+        token = self.peek()
+        if token is None or (expected is not None and token != expected):
+            raise RuleError(f"Expected {expected or 'more input'} in {self.text!r}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.expr()
+        if self.peek() is not None:
+            raise RuleError(f"Unexpected {self.peek()!r} in {self.text!r}")
+        return node
+
+    def expr(self):
+        node = self.term()
+        while self.peek() in ("+", "-"):
+            node = ("bin", self.take(), node, self.term())
+        return node
+
+    def term(self):
+        node = self.atom()
+        while self.peek() in ("*", "/"):
+            node = ("bin", self.take(), node, self.atom())
+        return node
+
+    def atom(self):
+        token = self.take()
+        if token == "(":
+            node = self.expr()
+            self.take(")")
+            return node
+        if token[0].isdigit() or token[0] == ".":
+            return ("num", float(token))
+        if token[0] == "'":
+            return ("str", token[1:-1])
+        if token in AGGREGATES and self.peek() == "(":
+            return self.aggregate(token)
+        if token[0].isalpha() or token[0] == "_":
+            return ("col", token)
+        raise RuleError(f"Unexpected {token!r} in {self.text!r}")
+
+    def aggregate(self, fn: str):
+        self.take("(")
+        target = self.expr()
+        condition = None
+        if self.peek() == "|":
+            self.take()
+            comparisons = [self.comparison()]
+            while self.peek() == "&":
+                self.take()
+                comparisons.append(self.comparison())
+            condition = ("and", tuple(comparisons))
+        param = None
+        if self.peek() == ",":
+            self.take()
+            param = float(self.take())
+        self.take(")")
+        if fn == "quantile" and param is None:
+            raise RuleError(f"quantile needs a q argument in {self.text!r}")
+        return ("agg", fn, target, condition, param)
+
+    def comparison(self):
+        left = self.expr()
+        op = self.take()
+        if op not in COMPARISONS:
+            raise RuleError(f"Expected a comparison, got {op!r} in {self.text!r}")
+        return ("cmp", op, left, self.expr())
+
+@lru_cache(maxsize=1024)
+def parse_metric(text: str):
+    return _Parser(text).parse()
+
+def _walk(node):
+    yield node
+    for child in node[1:]:
+        if isinstance(child, tuple):
+            yield from _walk(child)
+
+class _Evaluator:
+    """Evaluates metric nodes over one DataFrame, computing each distinct column, mask and aggregate once."""
+
+    def __init__(self, df: pd.DataFrame, quantiles: Dict[Tuple, List[float]], profile=None):
+        self.df = df
+        # Unfiltered aggregates of raw columns are answered from the load-time profile when given
+        self.profile = profile
+        # All quantiles requested for the same values are computed in one np.quantile call
+        self.quantiles = quantiles
+        self.memo: Dict[Any, Any] = {}
+
+    def value(self, node):
+        if node in self.memo:
+            return self.memo[node]
+        kind = node[0]
+        if kind == "num" or kind == "str":
+            result = node[1]
+        elif kind == "col":
+            if node[1] not in self.df.columns:
+                raise MissingColumn(node[1])
+            series = self.df[node[1]]
+            result = series.to_numpy(dtype=np.float64, na_value=np.nan) if pd.api.types.is_numeric_dtype(series) else series
+        elif kind == "bin":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                result = ARITHMETIC[node[1]](self.value(node[2]), self.value(node[3]))
+        elif kind == "cmp":
+            left, right = self.value(node[2]), self.value(node[3])
+            if isinstance(left, pd.Series) or isinstance(right, pd.Series):
+                result = np.asarray(COMPARISONS[node[1]](left, right), dtype=bool)
+            else:
+                with np.errstate(invalid="ignore"):
+                    result = COMPARISONS[node[1]](left, right)
+        elif kind == "and":
+            result = np.logical_and.reduce([self.value(c) for c in node[1]]) if len(node[1]) > 1 else self.value(node[1][0])
+        elif kind == "agg":
+            result = self.aggregate(node)
+        else:
+            raise RuleError(f"Unknown node {kind}")
+        self.memo[node] = result
+        return result
+
+    def selected(self, target, condition):
+        """Values of target on the rows matching condition, without missing values."""
+        key = ("selected", target, condition)
+        if key not in self.memo:
+            values = self.value(target)
+            if condition is not None:
+                values = values[self.value(condition)]
+            if isinstance(values, pd.Series):
+                values = values.dropna()
+            else:
+                values = values[~np.isnan(values)]
+            self.memo[key] = values
+        return self.memo[key]
+
+    def _from_profile(self, fn: str, target, condition, param):
+        if self.profile is None or condition is not None or target[0] != "col":
+            return None
+        column = self.profile.columns.get(target[1])
+        if column is None or not column.numeric or fn not in PROFILE_AGGREGATES:
+            return None
+        if fn in ("quantile", "median"):
+            # Constant time from the quantile sketch, within its rank error
+            return column.sketch.quantile(0.5 if fn == "median" else param)
+        return float(column.count if fn == "count" else getattr(column, fn))
+
+    def aggregate(self, node):
+        _, fn, target, condition, param = node
+        profiled = self._from_profile(fn, target, condition, param)
+        if profiled is not None:
+            return profiled
+        values = self.selected(target, condition)
+        if fn == "count":
+            return float(len(values))
+        if fn == "mode":
+            return pd.Series(values).mode().iloc[0] if len(values) else None
+        if fn == "nunique":
+            return float(pd.Series(values).nunique())
+        if isinstance(values, pd.Series):
+            raise RuleError(f"{fn} needs a numeric column")
+        if len(values) == 0:
+            return np.nan
+        if fn == "mean":
+            return float(values.mean())
+        if fn == "sum":
+            return float(values.sum())
+        if fn == "min":
+            return float(values.min())
+        if fn == "max":
+            return float(values.max())
+        qs = self.quantiles.get((target, condition), [])
+        q = 0.5 if fn == "median" else param
+        key = ("quantiles", target, condition)
+        if key not in self.memo:
+            self.memo[key] = dict(zip(qs, np.quantile(values, qs))) if qs else {}
+        if q not in self.memo[key]:
+            self.memo[key][q] = float(np.quantile(values, q))
+        return float(self.memo[key][q])
+
+class CompiledRules:
+    """A rule set parsed once, with the quantiles it needs grouped by the values they summarize."""
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        self.rules = rules
+        self.metrics = [parse_metric(rule["metric"]) for rule in rules]
+        self.thresholds = [parse_metric(rule["threshold"]) if isinstance(rule.get("threshold"), str)
+                           else ("num", float(rule["threshold"])) if rule.get("threshold") is not None else None
+                           for rule in rules]
+        self.quantiles: Dict[Tuple, List[float]] = {}
+        for root in self.metrics + [t for t in self.thresholds if t is not None]:
+            for node in _walk(root):
+                if node[0] == "agg" and node[1] in ("quantile", "median"):
+                    qs = self.quantiles.setdefault((node[2], node[3]), [])
+                    q = 0.5 if node[1] == "median" else node[4]
+                    if q not in qs:
+                        qs.append(q)
+
+    def evaluate(self, df: pd.DataFrame, profile=None) -> List[Dict[str, str]]:
+        evaluator = _Evaluator(df, self.quantiles, profile)
+        insights = []
+        for rule, metric, threshold in zip(self.rules, self.metrics, self.thresholds):
+            try:
+                value = evaluator.value(metric)
+                if rule.get("operator") is not None:
+                    if value is None or not bool(COMPARISONS[rule["operator"]](value, evaluator.value(threshold))):
+                        continue
+            except MissingColumn:
+                # Rules about columns this upload does not have simply do not apply
+                continue
+            insights.append({"category": rule["category"], "insight": rule["insight"].format(value=value),
+                             "impact": rule["impact"]})
+        return insights
+
+@lru_cache(maxsize=64)
+def _compile(rules_key: Tuple) -> CompiledRules:
+    return CompiledRules([dict(rule) for rule in rules_key])
+
+def rules_key(rules: List[Dict[str, Any]]) -> Tuple:
+    """Hashable identity of a rule set (for compiling once and for result cache keys)."""
+    return tuple(tuple(sorted(rule.items())) for rule in rules)
+
+def threshold_rules(name: str) -> List[Dict[str, Any]]:
+    """User-defined rules from the thresholds table: kpi_name "<dataset>:<metric>", e.g. "ads:mean(cost)"."""
+    from backend.app.database import get_db
+    try:
+        conn = get_db()
+        rows = conn.execute("SELECT kpi_name, operator, value FROM thresholds WHERE kpi_name LIKE ? ORDER BY rowid",
+                            (f"{name}:%",)).fetchall()
+        conn.close()
+    except sqlite3.Error:
+        return []
+    rules = []
+    for row in rows:
+        metric = row["kpi_name"].split(":", 1)[1]
+        try:
+            parse_metric(metric)
+        except RuleError:
+            # Thresholds also hold plain KPI names for the friendly API; only valid expressions become rules
+            continue
+        if row["operator"] in COMPARISONS:
+            rules.append({"category": "Alert", "metric": metric, "operator": row["operator"], "threshold": row["value"],
+                          "impact": "Medium", "insight": f"{metric} is {{value:,.4g}} ({row['operator']} {row['value']:g})."})
+    return rules
+
+def rules_for(name: str) -> List[Dict[str, Any]]:
+    return BUILTIN_RULES.get(name, []) + threshold_rules(name)
+
+def generate(df: pd.DataFrame, rules: List[Dict[str, Any]], profile=None) -> List[Dict[str, str]]:
+    return _compile(rules_key(rules)).evaluate(df, profile)
@@ -1,7 +1,10 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Any
-from backend import analysis, models, database
+from fastapi.responses import JSONResponse
+from typing import List, Dict, Any, Optional, Union
+from backend import analysis, models, database, cache, executor, insights, segmentation, serialization, tables
+import numpy as np
+import pandas as pd
 from pydantic import BaseModel
 import os
 
@@ -16,6 +19,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(executor.Saturated)
+@app.exception_handler(executor.TimedOut)
+async def analysis_unavailable(request: Request, exc: Exception):
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(exc.retry_after)})
+
+@app.on_event("shutdown")
+def on_shutdown():
+    executor.pool.shutdown(wait=False)
+
 class LoginRequest(BaseModel):
     email: str
     password: str
@@ -65,46 +78,160 @@ async def upload_dataset(dataset_type: str, file: UploadFile = File(...)):
     print(f"Received upload request for {dataset_type}")
     content = await file.read()
     try:
-        summary = analysis.load_dataset(dataset_type, content)
+        summary = await executor.pool.run(analysis.load_dataset, dataset_type, content)
         return summary
+    except (executor.Saturated, executor.TimedOut):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/data/{dataset_type}/preview")
-async def get_data_preview(dataset_type: str, rows: int = 5):
+async def get_data_preview(request: Request, dataset_type: str, rows: int = 5):
+    """Rows as JSON records, or as Arrow IPC / column-oriented JSON when the Accept header asks for it."""
+    fmt = serialization.negotiate(request.headers.get("accept"))
     try:
-        return analysis.get_dataset_preview(dataset_type, rows)
+        if fmt == "json":
+            return analysis.get_dataset_preview(dataset_type, rows)
+        return serialization.table_response(analysis.get_preview_frame(dataset_type, rows), fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.get("/data/{dataset_type}/table")
+async def get_data_table(request: Request, dataset_type: str, offset: int = Query(0, ge=0),
+                         limit: int = Query(100, ge=1, le=tables.MAX_PAGE_ROWS),
+                         columns: Optional[List[str]] = Query(None), sort: Optional[str] = None,
+                         desc: bool = False, filter: Optional[List[str]] = Query(None)):
+    """A page of rows with projection, sorting and filters (column:op:value, op in eq/ne/lt/lte/gt/gte).
+
+    Follow next_offset to the next page; it is null on the last one.
+    """
+    fmt = serialization.negotiate(request.headers.get("accept"))
+    try:
+        result = await executor.pool.run(analysis.get_table_page, dataset_type, offset, limit, columns, sort, desc, filter)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    rows = result.pop("rows")
+    if fmt == "json":
+        return {**result, "rows": rows.replace({np.nan: None}).to_dict(orient="records")}
+    return serialization.table_response(rows, fmt, metadata=result)
+
+@app.get("/data/{dataset_type}/memory")
+async def get_data_memory(dataset_type: str):
+    try:
+        return analysis.get_memory_report(dataset_type)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 @app.get("/data/{dataset_type}/stats")
-async def get_data_stats(dataset_type: str):
+async def get_data_stats(request: Request, dataset_type: str):
+    fmt = serialization.negotiate(request.headers.get("accept"))
+    try:
+        stats = cache.results.get_or_compute(
+            (dataset_type, analysis.dataset_version(dataset_type), "stats"),
+            lambda: analysis.get_summary_statistics(dataset_type))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if fmt == "json":
+        return stats
+    # One row per dataset column, one column per statistic
+    frame = pd.DataFrame.from_dict(stats, orient="index").rename_axis("column").reset_index()
+    return serialization.table_response(frame, fmt)
+
+@app.get("/data/{dataset_type}/percentiles")
+async def get_percentiles(dataset_type: str, q: List[float] = Query([0.25, 0.5, 0.75]),
+                          column: Optional[List[str]] = Query(None)):
+    """Percentiles per numeric column from the quantile sketches built at upload, with their rank error."""
     try:
-        return analysis.get_summary_statistics(dataset_type)
+        return cache.results.get_or_compute(
+            (dataset_type, analysis.dataset_version(dataset_type), "percentiles", tuple(q), tuple(column or ())),
+            lambda: analysis.get_percentiles(dataset_type, q, column))
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e.args[0]))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 @app.get("/data/{dataset_type}/kpis")
 async def get_kpis(dataset_type: str):
     try:
-        return analysis.calculate_kpis(dataset_type)
+        return cache.results.get_or_compute(
+            (dataset_type, analysis.dataset_version(dataset_type), "kpis"),
+            lambda: analysis.calculate_kpis(dataset_type))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 @app.get("/data/{dataset_type}/segmentation")
-async def get_segmentation(dataset_type: str, n_clusters: int = 3):
+async def get_segmentation(request: Request, dataset_type: str, n_clusters: int = 3, mode: str = "auto"):
+    """Cluster summaries; with Arrow or columnar JSON the sample points come as one table for all clusters."""
+    if mode not in segmentation.MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(segmentation.MODES)}")
+    fmt = serialization.negotiate(request.headers.get("accept"))
+    columnar = fmt != "json"
     try:
-        return analysis.perform_segmentation(dataset_type, n_clusters)
+        result = await executor.cached(
+            (dataset_type, analysis.dataset_version(dataset_type), "segmentation", n_clusters, mode, columnar),
+            analysis.perform_segmentation, dataset_type, n_clusters, mode, columnar)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    if not columnar or "points" not in result:
+        return result
+    if fmt == "arrow":
+        summary = {key: value for key, value in result.items() if key != "points"}
+        return serialization.table_response(pd.DataFrame(result["points"]), fmt, metadata=summary)
+    return serialization.columns_response(result)
+
+@app.get("/data/{dataset_type}/segmentation/sweep")
+async def sweep_segmentation(dataset_type: str, k_min: int = 2, k_max: int = 8, mode: str = "auto"):
+    """Fits k_min..k_max in parallel and recommends k by sampled silhouette score."""
+    if mode not in segmentation.MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(segmentation.MODES)}")
+    if dataset_type not in analysis.DATASETS:
+        raise HTTPException(status_code=404, detail=f"Dataset {dataset_type} not found")
+    try:
+        return await executor.cached(
+            (dataset_type, analysis.dataset_version(dataset_type), "sweep", k_min, k_max, mode),
+            analysis.sweep_segmentation, dataset_type, k_min, k_max, mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/data/{dataset_type}/segmentation/assign")
+async def assign_segments(dataset_type: str, records: Union[Dict[str, float], List[Dict[str, float]]],
+                          n_clusters: int = 3, mode: str = "auto"):
+    """Assigns one record or a batch to the clusters of the stored model, without refitting."""
+    if mode not in segmentation.MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(segmentation.MODES)}")
+    batch = records if isinstance(records, list) else [records]
+    try:
+        assignments = await executor.pool.run(analysis.assign_segments, dataset_type, batch, n_clusters, mode)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return assignments if isinstance(records, list) else assignments[0]
 
 @app.get("/data/{dataset_type}/insights")
 async def get_insights(dataset_type: str):
     try:
-        return analysis.generate_insights(dataset_type)
+        return await executor.cached(
+            (dataset_type, analysis.dataset_version(dataset_type), "insights",
+             insights.rules_key(insights.rules_for(dataset_type))),
+            analysis.generate_insights, dataset_type)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
+@app.get("/datasets/stats")
+async def get_dataset_store_stats():
+    return analysis.DATASETS.stats()
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return cache.results.stats()
+
+@app.get("/executor/stats")
+async def get_executor_stats():
+    return executor.pool.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
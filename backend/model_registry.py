@@ -0,0 +1,55 @@
+import hashlib
+import os
+import joblib
+from typing import Callable, List
+from urllib.parse import quote
+from backend.cache import ResultCache
+from backend.segmentation import SegmentationPipeline
+
+MODEL_DIR = os.environ.get("INSIGHTIFY_MODEL_DIR", "backend/data/models")
+
+# Fitted pipelines recently used by this process; the files in MODEL_DIR are shared by all workers
+_models = ResultCache(max_entries=int(os.environ.get("INSIGHTIFY_MODEL_CACHE_ENTRIES", "32")))
+
+def _prefix(name: str) -> str:
+    return quote(name, safe="") + "--"
+
+def model_path(name: str, version: int, features: List[str], n_clusters: int, mode: str) -> str:
+    feature_hash = hashlib.sha1(",".join(features).encode()).hexdigest()[:10]
+    return os.path.join(MODEL_DIR, f"{_prefix(name)}v{version}--{feature_hash}--k{n_clusters}--{mode}.joblib")
+
+def _load_or_fit(name: str, version: int, features: List[str], n_clusters: int, mode: str,
+                 fit: Callable[[], SegmentationPipeline], persist: bool) -> SegmentationPipeline:
+    if not persist:
+        return fit()
+    path = model_path(name, version, features, n_clusters, mode)
+    if os.path.exists(path):
+        return joblib.load(path)
+
+    pipeline = fit()
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    partial = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(pipeline, partial)
+    os.replace(partial, path)
+    # Models of older dataset versions can never be requested again
+    current = f"{_prefix(name)}v{version}--"
+    for filename in os.listdir(MODEL_DIR):
+        if filename.startswith(_prefix(name)) and not filename.startswith(current) and filename.endswith(".joblib"):
+            os.remove(os.path.join(MODEL_DIR, filename))
+    return pipeline
+
+def get_or_fit(name: str, version: int, features: List[str], n_clusters: int, mode: str,
+               fit: Callable[[], SegmentationPipeline], persist: bool = True) -> SegmentationPipeline:
+    """Returns the pipeline fitted for this dataset version, features, k and mode, fitting it at most once.
+
+    persist=False keeps the model in this process only, for datasets whose
+    version numbers are not shared between processes.
+    """
+    key = (name, version, tuple(features), n_clusters, mode)
+    return _models.get_or_compute(key, lambda: _load_or_fit(name, version, features, n_clusters, mode, fit, persist))
+
+def invalidate(name: str):
+    _models.invalidate(name)
+
+def stats():
+    return _models.stats()
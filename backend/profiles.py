@@ -0,0 +1,189 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+from backend.sketches import KLL
+
+# Per-dataset ratio columns profiled alongside the raw ones: name -> (numerator columns, denominator)
+DERIVED_COLUMNS = {
+    "youtube": {"engagement_rate": (["likes", "comments"], "views")},
+    "ads": {"ctr": (["clicks"], "impressions"), "conversion_rate": (["conversions"], "clicks")},
+}
+QUANTILE_K = int(os.environ.get("INSIGHTIFY_QUANTILE_K", "200"))
+# Distinct values counted per categorical column; beyond this only the most frequent are kept
+TOP_K_CAPACITY = int(os.environ.get("INSIGHTIFY_TOP_K_CAPACITY", "1000"))
+DESCRIBE_QUANTILES = (0.25, 0.5, 0.75)
+
+class ColumnProfile:
+    """Mergeable summary of one column: counts, nulls, and either moments plus a quantile sketch
+    (numeric columns) or value counts (everything else)."""
+
+    def __init__(self, numeric: bool, derived: bool = False):
+        self.numeric = numeric
+        self.derived = derived
+        self.count = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.sum = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sketch = KLL(QUANTILE_K) if numeric else None
+        self.top: Optional[Dict[str, int]] = None if numeric else {}
+
+    def _merge_moments(self, count: int, total, mean: float, m2: float, lo, hi):
+        # Chan et al. pairwise update, so chunks and imports combine exactly like one pass
+        if count == 0:
+            return
+        combined = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / combined
+        self.m2 += m2 + delta * delta * self.count * count / combined
+        self.count = combined
+        self.sum += total
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+
+    def update_numeric(self, values: np.ndarray, integer: bool):
+        """Adds a float64 column (NaN for missing values)."""
+        present = values[~np.isnan(values)]
+        self.nulls += len(values) - len(present)
+        if len(present) == 0:
+            return
+        mean = float(present.mean())
+        total = int(present.sum()) if integer else float(present.sum())
+        self._merge_moments(len(present), total, mean, float(((present - mean) ** 2).sum()),
+                            float(present.min()), float(present.max()))
+        self.sketch.add(present)
+
+    def update_values(self, series: pd.Series):
+        counts = series.value_counts(dropna=True)
+        self.nulls += len(series) - int(counts.sum())
+        self.count += int(counts.sum())
+        for value, count in counts.items():
+            key = str(value)
+            self.top[key] = self.top.get(key, 0) + int(count)
+        self._trim()
+
+    def _trim(self):
+        if len(self.top) > TOP_K_CAPACITY:
+            kept = sorted(self.top.items(), key=lambda item: (-item[1], item[0]))[:TOP_K_CAPACITY]
+            self.top = dict(kept)
+
+    def merge(self, other: "ColumnProfile"):
+        self.nulls += other.nulls
+        if self.numeric:
+            self._merge_moments(other.count, other.sum, other.mean, other.m2, other.min, other.max)
+            self.sketch.merge(other.sketch)
+        else:
+            self.count += other.count
+            for key, count in other.top.items():
+                self.top[key] = self.top.get(key, 0) + count
+            self._trim()
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else float("nan")
+
+    def top_values(self, k: int = 10) -> List[Dict[str, Any]]:
+        ranked = sorted(self.top.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [{"value": value, "count": count} for value, count in ranked]
+
+    def mode(self):
+        """Most frequent value; ties resolve to the smallest, like pandas' mode()[0]."""
+        ranked = self.top_values(1)
+        return ranked[0]["value"] if ranked else None
+
+    def describe(self) -> Dict[str, float]:
+        stats = {"count": float(self.count), "mean": self.mean if self.count else float("nan"), "std": self.std,
+                 "min": self.min if self.min is not None else float("nan")}
+        for q, value in zip(DESCRIBE_QUANTILES, self.sketch.quantiles(DESCRIBE_QUANTILES)):
+            stats[f"{q:.0%}"] = float(value)
+        stats["max"] = self.max if self.max is not None else float("nan")
+        return stats
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"numeric": self.numeric, "derived": self.derived, "count": self.count, "nulls": self.nulls}
+        if self.numeric:
+            data.update({"min": self.min, "max": self.max, "sum": self.sum, "mean": self.mean, "m2": self.m2,
+                         "sketch": self.sketch.to_dict()})
+        else:
+            data["top"] = self.top
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ColumnProfile":
+        column = cls(data["numeric"], data.get("derived", False))
+        column.count, column.nulls = data["count"], data["nulls"]
+        if column.numeric:
+            column.min, column.max, column.sum = data["min"], data["max"], data["sum"]
+            column.mean, column.m2 = data["mean"], data["m2"]
+            column.sketch = KLL.from_dict(data["sketch"])
+        else:
+            column.top = data["top"]
+        return column
+
+def _is_numeric(series: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+class DatasetProfile:
+    """Per-column profiles of a dataset, built in one pass per chunk and mergeable across chunks."""
+
+    def __init__(self):
+        self.rows = 0
+        self.columns: Dict[str, ColumnProfile] = {}
+
+    def update(self, df: pd.DataFrame, derived: Optional[Dict[str, tuple]] = None):
+        self.rows += len(df)
+        numeric = [name for name in df.columns if _is_numeric(df[name])]
+        # One float64 block for all numeric columns; every statistic reads from it
+        block = df[numeric].to_numpy(dtype=np.float64, na_value=np.nan) if numeric else np.empty((len(df), 0))
+        index = {name: i for i, name in enumerate(numeric)}
+        for name in df.columns:
+            if name in index:
+                column = self.columns.setdefault(name, ColumnProfile(numeric=True))
+                column.update_numeric(block[:, index[name]], pd.api.types.is_integer_dtype(df[name]))
+            else:
+                self.columns.setdefault(name, ColumnProfile(numeric=False)).update_values(df[name])
+
+        for name, (numerators, denominator) in (derived or {}).items():
+            if all(col in index for col in numerators + [denominator]):
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    values = sum(block[:, index[col]] for col in numerators) / block[:, index[denominator]]
+                self.columns.setdefault(name, ColumnProfile(numeric=True, derived=True)).update_numeric(values, False)
+
+    def merge(self, other: "DatasetProfile"):
+        self.rows += other.rows
+        for name, column in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(column)
+            else:
+                self.columns[name] = ColumnProfile.from_dict(column.to_dict())
+
+    def column(self, name: str) -> ColumnProfile:
+        if name not in self.columns:
+            raise KeyError(name)
+        return self.columns[name]
+
+    def missing_values(self) -> Dict[str, int]:
+        return {name: column.nulls for name, column in self.columns.items() if not column.derived}
+
+    def describe(self) -> Dict[str, Dict[str, float]]:
+        """Same shape as DataFrame.describe().to_dict(); percentiles come from the sketches."""
+        return {name: column.describe() for name, column in self.columns.items()
+                if column.numeric and not column.derived}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"rows": self.rows, "columns": {name: column.to_dict() for name, column in self.columns.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DatasetProfile":
+        profile = cls()
+        profile.rows = data["rows"]
+        profile.columns = {name: ColumnProfile.from_dict(column) for name, column in data["columns"].items()}
+        return profile
+
+def build(df: pd.DataFrame, name: Optional[str] = None) -> DatasetProfile:
+    profile = DatasetProfile()
+    profile.update(df, DERIVED_COLUMNS.get(name))
+    return profile
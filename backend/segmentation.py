@@ -0,0 +1,176 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+from joblib import Parallel, delayed
+from sklearn.cluster import KMeans
+from sklearn.decomposition import PCA
+from sklearn.metrics import silhouette_score
+from sklearn.preprocessing import StandardScaler
+
+SEGMENTATION_FEATURES: Dict[str, List[str]] = {
+    "youtube": ["views", "likes", "watch_time_minutes"],
+    "ads": ["impressions", "clicks", "cost"],
+    "banking": ["account_balance", "transaction_count", "products_used"],
+}
+
+# "auto" mode switches to the fast path above this many rows
+EXACT_MAX_ROWS = int(os.environ.get("INSIGHTIFY_SEGMENTATION_EXACT_MAX_ROWS", "100000"))
+# Rows sampled to fit KMeans and PCA on the fast path; every row is then assigned to the fitted centers
+FIT_SAMPLE_ROWS = int(os.environ.get("INSIGHTIFY_SEGMENTATION_FIT_SAMPLE", "50000"))
+PCA_SAMPLE_ROWS = int(os.environ.get("INSIGHTIFY_SEGMENTATION_PCA_SAMPLE", "10000"))
+MODES = ("auto", "exact", "fast")
+POINTS_PER_CLUSTER = 50
+# Parallel workers for k sweeps (joblib semantics: -1 uses every core)
+SWEEP_WORKERS = int(os.environ.get("INSIGHTIFY_SWEEP_WORKERS", "-1"))
+SILHOUETTE_SAMPLE_ROWS = 5000
+MAX_SWEEP_K = 20
+
+def resolve_mode(mode: str, n_rows: int) -> str:
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    if mode == "auto":
+        return "fast" if n_rows > EXACT_MAX_ROWS else "exact"
+    return mode
+
+def feature_matrix(df: pd.DataFrame, features: List[str]) -> np.ndarray:
+    """Float matrix of the feature columns without missing values, without copying the rest of df."""
+    values = df[features].to_numpy(dtype=np.float64)
+    return values[~np.isnan(values).any(axis=1)]
+
+def _sample(scaled: np.ndarray, rows: int) -> np.ndarray:
+    if len(scaled) <= rows:
+        return scaled
+    rng = np.random.default_rng(42)
+    return scaled[rng.choice(len(scaled), rows, replace=False)]
+
+def fit_kmeans(scaled: np.ndarray, n_clusters: int, mode: str) -> KMeans:
+    sample = _sample(scaled, FIT_SAMPLE_ROWS) if mode == "fast" else scaled
+    return KMeans(n_clusters=n_clusters, random_state=42).fit(sample)
+
+def fit_pca(scaled: np.ndarray, mode: str) -> PCA:
+    sample = _sample(scaled, PCA_SAMPLE_ROWS) if mode == "fast" else scaled
+    return PCA(n_components=2).fit(sample)
+
+class SegmentationPipeline:
+    """A fitted scaler, KMeans and 2D PCA projection for one feature list and k."""
+
+    def __init__(self, features: List[str], n_clusters: int, mode: str,
+                 scaler: StandardScaler, kmeans: KMeans, pca: PCA):
+        self.features = features
+        self.n_clusters = n_clusters
+        self.mode = mode
+        self.scaler = scaler
+        self.kmeans = kmeans
+        self.pca = pca
+
+    @classmethod
+    def fit(cls, values: np.ndarray, features: List[str], n_clusters: int = 3, mode: str = "auto") -> "SegmentationPipeline":
+        mode = resolve_mode(mode, len(values))
+        scaler = StandardScaler().fit(values)
+        scaled = scaler.transform(values)
+        return cls(features, n_clusters, mode, scaler, fit_kmeans(scaled, n_clusters, mode), fit_pca(scaled, mode))
+
+    def assign(self, values: np.ndarray):
+        """Returns cluster labels and 2D coordinates for new rows without refitting."""
+        scaled = self.scaler.transform(values)
+        return self.kmeans.predict(scaled), self.pca.transform(scaled)
+
+    def summarize(self, values: np.ndarray, columnar_points: bool = False) -> Dict[str, Any]:
+        """Sizes, feature means and sample points per cluster for the dashboard.
+
+        Built in one grouped pass over the rows regardless of k: sizes and
+        feature sums via bincount, and a uniform random sample of points per
+        cluster from one shuffle plus a stable (radix) sort by label.
+
+        With columnar_points the sample points are returned once for all clusters
+        as arrays under "points" ({"cluster_id", "x", "y"}) instead of per-cluster dicts.
+        """
+        scaled = self.scaler.transform(values)
+        # Every row is assigned to the nearest fitted center (the fast path fitted on a sample)
+        labels = self.kmeans.predict(scaled)
+        k = self.n_clusters
+
+        sizes = np.bincount(labels, minlength=k)
+        sums = np.column_stack([np.bincount(labels, weights=values[:, j], minlength=k) for j in range(values.shape[1])])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / sizes[:, None]
+
+        # Shuffle once (seeded, so results are reproducible), then group by label keeping the shuffled order
+        shuffled = np.random.default_rng(42).permutation(len(labels))
+        grouped = shuffled[np.argsort(labels[shuffled].astype(np.int16 if k < 2 ** 15 else np.int64), kind="stable")]
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        picks = [grouped[start:start + min(size, POINTS_PER_CLUSTER)] for start, size in zip(starts, sizes)]
+        # PCA projection only for the sampled points, in a single call
+        coords = self.pca.transform(scaled[np.concatenate(picks)]) if len(labels) else np.empty((0, 2))
+        offsets = np.concatenate([[0], np.cumsum([len(p) for p in picks])])
+
+        cluster_summary = []
+        for i in range(k):
+            cluster = {
+                "cluster_id": i,
+                "size": int(sizes[i]),
+                "features": {f: (m if sizes[i] else None) for f, m in zip(self.features, means[i].tolist())},
+            }
+            if not columnar_points:
+                xs, ys = coords[offsets[i]:offsets[i + 1]].T.tolist() if sizes[i] else ([], [])
+                cluster["points"] = [{"x": x, "y": y} for x, y in zip(xs, ys)]
+            cluster_summary.append(cluster)
+
+        result = {"clusters": cluster_summary, "mode": self.mode}
+        if columnar_points:
+            result["points"] = {"cluster_id": np.repeat(np.arange(k), np.diff(offsets)),
+                                "x": np.ascontiguousarray(coords[:, 0]), "y": np.ascontiguousarray(coords[:, 1])}
+        return result
+
+def segment(values: np.ndarray, features: List[str], n_clusters: int = 3, mode: str = "auto") -> Dict[str, Any]:
+    """Clusters the rows of values and summarizes each cluster for the dashboard."""
+    return SegmentationPipeline.fit(values, features, n_clusters, mode).summarize(values)
+
+def _score_k(scaled: np.ndarray, n_clusters: int, mode: str, sample: np.ndarray):
+    kmeans = fit_kmeans(scaled, n_clusters, mode)
+    # Inertia over every row (not just a fit sample) so values are comparable across k
+    inertia = float(-kmeans.score(scaled))
+    sample_labels = kmeans.predict(scaled[sample])
+    silhouette = float(silhouette_score(scaled[sample], sample_labels)) if len(np.unique(sample_labels)) > 1 else -1.0
+    return n_clusters, inertia, silhouette, kmeans
+
+def _elbow(ks: List[int], inertias: List[float]) -> Optional[int]:
+    """k with the largest second difference of inertia (sharpest bend), if there are enough points."""
+    if len(ks) < 3:
+        return None
+    bends = [inertias[i - 1] - 2 * inertias[i] + inertias[i + 1] for i in range(1, len(ks) - 1)]
+    return ks[1 + int(np.argmax(bends))]
+
+def sweep(values: np.ndarray, features: List[str], k_min: int = 2, k_max: int = 8, mode: str = "auto"):
+    """Fits every k in [k_min, k_max] in parallel on data scaled once.
+
+    Returns the per-k scores (with the recommended k by sampled silhouette)
+    and the pipeline fitted for the recommended k.
+    """
+    if not 2 <= k_min <= k_max <= MAX_SWEEP_K:
+        raise ValueError(f"k range must satisfy 2 <= k_min <= k_max <= {MAX_SWEEP_K}")
+    if len(values) <= k_max:
+        raise ValueError(f"Need more than {k_max} rows to sweep up to k={k_max}")
+    mode = resolve_mode(mode, len(values))
+
+    scaler = StandardScaler().fit(values)
+    scaled = scaler.transform(values)
+    pca = fit_pca(scaled, mode)
+    rng = np.random.default_rng(42)
+    sample = rng.choice(len(scaled), min(len(scaled), SILHOUETTE_SAMPLE_ROWS), replace=False)
+
+    # joblib memory-maps scaled for the worker processes instead of copying it per task
+    scores = Parallel(n_jobs=SWEEP_WORKERS)(
+        delayed(_score_k)(scaled, k, mode, sample) for k in range(k_min, k_max + 1))
+
+    ks = [k for k, _, _, _ in scores]
+    inertias = [inertia for _, inertia, _, _ in scores]
+    best_k, _, _, best_kmeans = max(scores, key=lambda score: (score[2], -score[0]))
+    pipeline = SegmentationPipeline(features, best_k, mode, scaler, best_kmeans, pca)
+    return {
+        "mode": mode,
+        "recommended_k": best_k,
+        "elbow_k": _elbow(ks, inertias),
+        "results": [{"k": k, "inertia": inertia, "silhouette": silhouette} for k, inertia, silhouette, _ in scores],
+    }, pipeline
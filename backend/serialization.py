@@ -0,0 +1,91 @@
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from typing import Any, Dict, Optional
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used without it
+    orjson = None
+
+# Response formats negotiated from the Accept header:
+#   json     the endpoint's regular row-oriented JSON
+#   columns  {"columns": [...], "data": {column: [values...]}} - one array per column
+#   arrow    Apache Arrow IPC stream; endpoint-level extras travel in the schema metadata
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+COLUMNS_MEDIA_TYPE = "application/vnd.insightify.columns+json"
+FORMATS = {ARROW_MEDIA_TYPE: "arrow", COLUMNS_MEDIA_TYPE: "columns", "application/json": "json"}
+_METADATA_KEY = b"insightify"
+
+def negotiate(accept: Optional[str]) -> str:
+    """Picks the format with the highest q value in an Accept header (json when none is supported)."""
+    best, best_q = "json", 0.0
+    for part in (accept or "").split(","):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media_type in FORMATS and q > best_q:
+            best, best_q = FORMATS[media_type], q
+    return best
+
+def _column_values(series: pd.Series):
+    """A column as a numpy array when the encoder can write it directly, otherwise a list."""
+    if pd.api.types.is_bool_dtype(series) and not series.hasnans:
+        return series.to_numpy(dtype=bool)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        if pd.api.types.is_integer_dtype(series) and not series.hasnans:
+            return series.to_numpy(dtype=np.int64)
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        series = series.dt.strftime("%Y-%m-%dT%H:%M:%S")
+    values = series.astype(object)
+    return values.where(series.notna(), None).tolist()
+
+def columns_of(df: pd.DataFrame) -> Dict[str, Any]:
+    return {"columns": df.columns.tolist(), "data": {name: _column_values(df[name]) for name in df.columns}}
+
+def _plain(value):
+    # Fallback path without orjson: numpy arrays become lists with NaN as null
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "f":
+            return [None if np.isnan(v) else v for v in value.tolist()]
+        return value.tolist()
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+def dumps(payload: Any) -> bytes:
+    """Encodes a payload that may contain numpy arrays; NaN is written as null."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_plain(payload), separators=(",", ":")).encode()
+
+def arrow_bytes(df: pd.DataFrame, metadata: Optional[Dict[str, Any]] = None) -> bytes:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _METADATA_KEY: dumps(metadata)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def table_response(df: pd.DataFrame, fmt: str, metadata: Optional[Dict[str, Any]] = None) -> Response:
+    """Serializes a frame as Arrow IPC or column-oriented JSON (metadata is merged into the JSON body)."""
+    if fmt == "arrow":
+        return Response(arrow_bytes(df, metadata), media_type=ARROW_MEDIA_TYPE, headers={"Vary": "Accept"})
+    return columns_response({**(metadata or {}), **columns_of(df)})
+
+def columns_response(payload: Any) -> Response:
+    """A column-oriented JSON body (already shaped by the caller) encoded with dumps."""
+    return Response(dumps(payload), media_type=COLUMNS_MEDIA_TYPE, headers={"Vary": "Accept"})
@@ -0,0 +1,225 @@
+import json
+import math
+import zlib
+import numpy as np
+import pandas as pd
+from typing import Iterable, Optional
+
+def hash_values(values) -> np.ndarray:
+    """Stable 64-bit hashes (identical across processes and runs) of the string form of values."""
+    return pd.util.hash_array(np.asarray(pd.Series(values, dtype=object).astype(str), dtype=object))
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Vectorized int.bit_length for uint64 arrays."""
+    exponent = np.frexp(values.astype(np.float64))[1].astype(np.int64)
+    # float64 rounding can push values just below 2**k up to 2**k; correct those
+    overshoot = (exponent > 0) & (values < np.left_shift(np.uint64(1), np.maximum(exponent - 1, 0).astype(np.uint64)))
+    return exponent - overshoot
+
+class HyperLogLog:
+    """Mergeable approximate distinct counter.
+
+    Memory is 2**precision bytes and the relative standard error is
+    1.04 / sqrt(2**precision), independent of the number of values added.
+    """
+
+    def __init__(self, precision: int = 14, registers: Optional[np.ndarray] = None):
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(1 << precision, dtype=np.uint8)
+
+    @classmethod
+    def for_error(cls, relative_error: float) -> "HyperLogLog":
+        """Creates a sketch with the smallest precision meeting the relative standard error."""
+        return cls(precision=precision_for_error(relative_error))
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(1 << self.precision)
+
+    def add(self, values):
+        hashes = hash_values(values)
+        if len(hashes) == 0:
+            return
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - _bit_length(remainder) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def reduce(self, precision: int) -> "HyperLogLog":
+        """Returns the exact equivalent sketch at a lower precision."""
+        if precision > self.precision:
+            raise ValueError("HyperLogLog precision can only be reduced")
+        if precision == self.precision:
+            return HyperLogLog(precision, self.registers.copy())
+        shift = self.precision - precision
+        index = np.arange(len(self.registers), dtype=np.uint64)
+        tail = index & np.uint64((1 << shift) - 1)
+        # The dropped index bits become the leading bits of the hash remainder
+        rank = np.where(tail > 0, shift - _bit_length(tail) + 1,
+                        np.where(self.registers > 0, self.registers.astype(np.int64) + shift, 0))
+        registers = np.zeros(1 << precision, dtype=np.uint8)
+        np.maximum.at(registers, (index >> np.uint64(shift)).astype(np.int64), rank.astype(np.uint8) * (self.registers > 0))
+        return HyperLogLog(precision, registers)
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision < self.precision:
+            reduced = self.reduce(other.precision)
+            self.precision, self.registers = reduced.precision, reduced.registers
+        elif other.precision > self.precision:
+            other = other.reduce(self.precision)
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(self.registers.tobytes())
+
+    @classmethod
+    def from_bytes(cls, precision: int, data: bytes) -> "HyperLogLog":
+        return cls(precision, np.frombuffer(zlib.decompress(data), dtype=np.uint8).copy())
+
+    @classmethod
+    def union(cls, sketches: Iterable["HyperLogLog"]) -> Optional["HyperLogLog"]:
+        result = None
+        for sketch in sketches:
+            if result is None:
+                result = cls(sketch.precision, sketch.registers.copy())
+            else:
+                result.merge(sketch)
+        return result
+
+def precision_for_error(relative_error: float) -> int:
+    return min(max(math.ceil(math.log2((1.04 / relative_error) ** 2)), 4), 18)
+
+class KLL:
+    """Mergeable quantile sketch (Karnin, Lang, Liberty).
+
+    Level h holds items of weight 2**h; a full level is sorted and every other item is promoted,
+    so memory stays around 3k items while rank error is about 1.7 / k of the count, whatever
+    the number of values added. Until the first compaction the sketch holds every value and
+    quantiles are exact (linearly interpolated, like numpy and pandas).
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        if k < 8:
+            raise ValueError("KLL k must be at least 8")
+        self.k = k
+        self.n = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def rank_error(self) -> float:
+        return 0.0 if self.exact else 1.7 / self.k
+
+    @property
+    def exact(self) -> bool:
+        return len(self.levels) == 1
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0, dtype=np.float64))
+            items = np.sort(items)
+            # An odd item out stays behind so the total weight is preserved exactly
+            keep = items[:1] if len(items) % 2 else items[:0]
+            pairs = items[len(keep):]
+            promoted = pairs[int(self._rng.integers(2))::2]
+            self.levels[level] = keep
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            # Capacities depend on the number of levels, so lower levels are rechecked
+            level = 0
+
+    def merge(self, other: "KLL"):
+        if other.n == 0:
+            return
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def quantiles(self, qs) -> np.ndarray:
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        if self.exact:
+            return np.quantile(self.levels[0], qs)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 1 << level, dtype=np.int64)
+                                  for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, weights = items[order], weights[order]
+        # Each retained item stands for `weight` ranks; interpolate between the centres of those ranges
+        centres = np.cumsum(weights) - weights / 2
+        result = np.interp(qs * self.n, centres, items)
+        # The extremes are tracked exactly
+        return np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, result))
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+    def to_dict(self) -> dict:
+        return {"k": self.k, "n": self.n, "min": self.min if self.n else None, "max": self.max if self.n else None,
+                "levels": [items.tolist() for items in self.levels]}
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(json.dumps(self.to_dict()).encode())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "KLL":
+        return cls.from_dict(json.loads(zlib.decompress(data)))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "KLL":
+        sketch = cls(data["k"])
+        sketch.n = data["n"]
+        if sketch.n:
+            sketch.min, sketch.max = data["min"], data["max"]
+        sketch.levels = [np.asarray(items, dtype=np.float64) for items in data["levels"]]
+        return sketch
+
+def merge_kll(sketches: Iterable["KLL"]) -> Optional["KLL"]:
+    result = None
+    for sketch in sketches:
+        if result is None:
+            result = sketch
+        else:
+            result.merge(sketch)
+    return result
@@ -0,0 +1,294 @@
+import atexit
+import json
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+# Object/string columns with at most this share of distinct values are stored as categoricals
+CATEGORY_MAX_RATIO = 0.5
+ARROW_STRINGS = os.environ.get("INSIGHTIFY_ARROW_STRINGS", "0") == "1"
+
+_INT_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+def _is_string(series: pd.Series) -> bool:
+    return pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+
+def _downcast_int(series: pd.Series) -> pd.Series:
+    if series.empty:
+        return series
+    # Keep two bits of headroom so sums and differences of a few columns cannot wrap around
+    magnitude = max(abs(int(series.min())), abs(int(series.max()))) * 4
+    for int_type in _INT_TYPES:
+        if magnitude <= np.iinfo(int_type).max:
+            return series.astype(int_type) if series.dtype != int_type else series
+    return series
+
+def _downcast_float(series: pd.Series) -> pd.Series:
+    narrow = series.astype(np.float32)
+    # Only when lossless: prices like 12.34 are not exactly representable in float32
+    exact = (narrow.astype(np.float64) == series) | series.isna()
+    return narrow if exact.all() else series
+
+def compact_frame(df: pd.DataFrame, arrow_strings: bool = ARROW_STRINGS) -> pd.DataFrame:
+    """Returns a copy of df with categorical strings and the narrowest lossless numeric dtypes."""
+    columns = {}
+    for name, series in df.items():
+        if pd.api.types.is_bool_dtype(series):
+            columns[name] = series
+        elif pd.api.types.is_integer_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+            columns[name] = _downcast_int(series)
+        elif pd.api.types.is_float_dtype(series):
+            columns[name] = _downcast_float(series)
+        elif _is_string(series) and len(series) and series.nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(series):
+            columns[name] = series.astype("category")
+        elif _is_string(series) and arrow_strings:
+            columns[name] = series.astype("string[pyarrow]")
+        else:
+            columns[name] = series
+    return pd.DataFrame(columns, index=df.index)
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> Dict[str, Any]:
+    """Per-column and total deep memory usage of a frame before and after compaction."""
+    before_bytes = before.memory_usage(deep=True, index=False)
+    after_bytes = after.memory_usage(deep=True, index=False)
+    return {
+        "before_bytes": int(before_bytes.sum()),
+        "after_bytes": int(after_bytes.sum()),
+        "ratio": round(float(before_bytes.sum() / after_bytes.sum()), 2) if after_bytes.sum() else None,
+        "columns": {
+            name: {
+                "dtype_before": str(before[name].dtype),
+                "dtype_after": str(after[name].dtype),
+                "before_bytes": int(before_bytes[name]),
+                "after_bytes": int(after_bytes[name]),
+            }
+            for name in before.columns
+        },
+    }
+
+def compact_with_report(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    compacted = compact_frame(df)
+    return compacted, memory_report(df, compacted)
+
+SPILL_ROOT = os.environ.get("INSIGHTIFY_SPILL_DIR", "backend/data/spill")
+# Arrow IPC files shared by every worker process; set to an empty string for process-private storage
+SHARED_DIR = os.environ.get("INSIGHTIFY_SHARED_DATASET_DIR", "backend/data/shared")
+MEMORY_BUDGET_BYTES = int(float(os.environ.get("INSIGHTIFY_DATASET_MEMORY_MB", "1024")) * 1024 * 1024)
+KEEP_VERSIONS = int(os.environ.get("INSIGHTIFY_KEEP_VERSIONS", "2"))
+
+_METADATA_KEY = b"insightify"
+
+def write_arrow(df: pd.DataFrame, path: str, metadata: Optional[Dict[str, Any]] = None):
+    """Writes df as a single-batch, uncompressed Arrow IPC file so readers can memory-map it."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata is not None:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _METADATA_KEY: json.dumps(metadata).encode()})
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(table.num_rows, 1))
+
+def read_arrow(path: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Memory-maps an Arrow IPC file; numeric columns without nulls are zero-copy views of the page cache."""
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    raw = (table.schema.metadata or {}).get(_METADATA_KEY)
+    return table.to_pandas(split_blocks=True), json.loads(raw) if raw else {}
+
+class DatasetStore:
+    """Named, versioned DataFrames held under a memory budget.
+
+    With a shared directory, every version is written once as an Arrow IPC
+    file and memory-mapped by each worker process, so all workers see the
+    same uploads and share one copy in the page cache. A small
+    ``<name>.version`` file names the current version; workers stat it on
+    access to notice uploads made by other processes.
+
+    Least recently used datasets are dropped from memory when the budget is
+    exceeded (spilled to Parquet first when there is no shared copy) and
+    reloaded on the next access. Supports the dict operations analysis.py
+    relies on: ``name in store``, ``store[name]`` (latest version) and
+    ``store[name] = df`` (new version).
+    """
+
+    def __init__(self, memory_budget_bytes: int = MEMORY_BUDGET_BYTES, spill_root: str = SPILL_ROOT,
+                 keep_versions: int = KEEP_VERSIONS, shared_dir: Optional[str] = SHARED_DIR):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.spill_root = spill_root
+        self.keep_versions = keep_versions
+        self.shared_dir = shared_dir or None
+        self._spill_dir = None
+        self._frames: "OrderedDict[Tuple[str, int], pd.DataFrame]" = OrderedDict()
+        self._sizes: Dict[Tuple[str, int], int] = {}
+        self._spilled: Dict[Tuple[str, int], str] = {}
+        self._metadata: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self._latest: Dict[str, int] = {}
+        self._pointer_mtimes: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.spills = 0
+
+    def _spill_path(self, key: Tuple[str, int]) -> str:
+        if self._spill_dir is None:
+            # Private to this process: another worker's "v1" of a dataset is a different frame
+            os.makedirs(self.spill_root, exist_ok=True)
+            self._spill_dir = tempfile.mkdtemp(prefix=f"store-{os.getpid()}-", dir=self.spill_root)
+            atexit.register(shutil.rmtree, self._spill_dir, True)
+        name, version = key
+        return os.path.join(self._spill_dir, f"{quote(name, safe='')}.v{version}.parquet")
+
+    def _shared_path(self, key: Tuple[str, int]) -> str:
+        name, version = key
+        return os.path.join(self.shared_dir, f"{quote(name, safe='')}.v{version}.arrow")
+
+    def _pointer_path(self, name: str) -> str:
+        return os.path.join(self.shared_dir, f"{quote(name, safe='')}.version")
+
+    def _refresh(self, name: str):
+        """Picks up a newer version published by another process; costs one stat() when unchanged."""
+        if self.shared_dir is None:
+            return
+        try:
+            mtime = os.stat(self._pointer_path(name)).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if self._pointer_mtimes.get(name) == mtime:
+            return
+        with open(self._pointer_path(name)) as f:
+            version = int(f.read().strip() or 0)
+        self._pointer_mtimes[name] = mtime
+        if version > self._latest.get(name, 0):
+            self._latest[name] = version
+            self._spilled[(name, version)] = self._shared_path((name, version))
+            self._drop_old_versions(name, delete_files=False)
+
+    def _publish(self, name: str, df: pd.DataFrame, metadata: Optional[Dict[str, Any]]) -> int:
+        os.makedirs(self.shared_dir, exist_ok=True)
+        self._refresh(name)
+        version = self._latest.get(name, 0) + 1
+        while True:
+            # Claim the version number atomically; a concurrent upload elsewhere gets the next one
+            try:
+                os.close(os.open(self._shared_path((name, version)), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                version += 1
+        partial = f"{self._shared_path((name, version))}.{os.getpid()}.tmp"
+        write_arrow(df, partial, metadata)
+        os.replace(partial, self._shared_path((name, version)))
+
+        pointer_tmp = f"{self._pointer_path(name)}.{os.getpid()}.tmp"
+        with open(pointer_tmp, "w") as f:
+            f.write(str(version))
+        os.replace(pointer_tmp, self._pointer_path(name))
+        return version
+
+    def put(self, name: str, df: pd.DataFrame, metadata: Optional[Dict[str, Any]] = None) -> int:
+        """Stores df as the next version of name and returns that version."""
+        with self._lock:
+            if self.shared_dir is not None:
+                version = self._publish(name, df, metadata)
+                key = (name, version)
+                self._spilled[key] = self._shared_path(key)
+                # Serve the memory-mapped copy so this process shares pages with the other workers
+                df, metadata = read_arrow(self._spilled[key])
+            else:
+                version = self._latest.get(name, 0) + 1
+                key = (name, version)
+            self._latest[name] = version
+            self._frames[key] = df
+            self._metadata[key] = metadata or {}
+            self._sizes[key] = int(df.memory_usage(deep=True).sum())
+            self._drop_old_versions(name, delete_files=True)
+            self._enforce_budget(keep=key)
+            return version
+
+    def get(self, name: str, version: Optional[int] = None) -> pd.DataFrame:
+        with self._lock:
+            self._refresh(name)
+            if name not in self._latest:
+                raise KeyError(name)
+            key = (name, version or self._latest[name])
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                return self._frames[key]
+            if key not in self._spilled:
+                raise KeyError(f"{name} v{key[1]}")
+            path = self._spilled[key]
+            if path.endswith(".arrow"):
+                df, self._metadata[key] = read_arrow(path)
+            else:
+                df = pd.read_parquet(path, memory_map=True)
+            self.loads += 1
+            self._frames[key] = df
+            self._sizes[key] = int(df.memory_usage(deep=True).sum())
+            self._enforce_budget(keep=key)
+            return df
+
+    def metadata(self, name: str) -> Dict[str, Any]:
+        """Metadata stored with the latest version (loads it if needed)."""
+        with self._lock:
+            self.get(name)
+            return self._metadata.get((name, self._latest[name]), {})
+
+    def version(self, name: str) -> int:
+        with self._lock:
+            self._refresh(name)
+            return self._latest.get(name, 0)
+
+    def names(self) -> List[str]:
+        return list(self._latest)
+
+    def _drop_old_versions(self, name: str, delete_files: bool):
+        oldest_kept = self._latest[name] - self.keep_versions + 1
+        for key in [k for k in list(self._frames) + list(self._spilled) if k[0] == name and k[1] < oldest_kept]:
+            self._frames.pop(key, None)
+            self._sizes.pop(key, None)
+            self._metadata.pop(key, None)
+            path = self._spilled.pop(key, None)
+            # Other workers may still map an old shared file; POSIX keeps it alive until they unmap it
+            if delete_files and path and os.path.exists(path):
+                os.remove(path)
+
+    def _enforce_budget(self, keep: Tuple[str, int]):
+        used = sum(self._sizes[k] for k in self._frames)
+        for key in list(self._frames):
+            if used <= self.memory_budget_bytes:
+                break
+            if key == keep:
+                continue
+            if key not in self._spilled:
+                path = self._spill_path(key)
+                self._frames[key].to_parquet(path, index=False)
+                self._spilled[key] = path
+                self.spills += 1
+            del self._frames[key]
+            used -= self._sizes.pop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "memory_used_bytes": sum(self._sizes[k] for k in self._frames),
+                "shared_dir": self.shared_dir,
+                "in_memory": [f"{name}@v{version}" for name, version in self._frames],
+                "spilled": [f"{name}@v{version}" for name, version in self._spilled if (name, version) not in self._frames],
+                "spills": self.spills,
+                "loads": self.loads,
+            }
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            self._refresh(name)
+            return name in self._latest
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        return self.get(name)
+
+    def __setitem__(self, name: str, df: pd.DataFrame):
+        self.put(name, df)
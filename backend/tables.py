@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple
+
+# Filters are "column:op:value", e.g. "category:eq:Sports" or "views:gte:1000"
+FILTER_OPS = {
+    "eq": lambda s, v: s == v, "ne": lambda s, v: s != v,
+    "lt": lambda s, v: s < v, "lte": lambda s, v: s <= v,
+    "gt": lambda s, v: s > v, "gte": lambda s, v: s >= v,
+}
+MAX_PAGE_ROWS = 1000
+
+def parse_filter(spec: str) -> Tuple[str, str, str]:
+    parts = spec.split(":", 2)
+    if len(parts) != 3 or parts[1] not in FILTER_OPS:
+        raise KeyError(f"Invalid filter {spec!r}; expected column:op:value with op in {', '.join(FILTER_OPS)}")
+    return parts[0], parts[1], parts[2]
+
+def check_columns(df: pd.DataFrame, columns: List[str]):
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise KeyError(f"Unknown columns: {', '.join(missing)}")
+
+def _typed(series: pd.Series, value: str):
+    """Converts a filter value from the query string to the column's type."""
+    if pd.api.types.is_bool_dtype(series):
+        return value.lower() in ("1", "true")
+    if pd.api.types.is_numeric_dtype(series):
+        try:
+            return float(value)
+        except ValueError:
+            raise KeyError(f"Filter value {value!r} is not a number")
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.Timestamp(value)
+    return value
+
+def filter_mask(df: pd.DataFrame, filters: List[Tuple[str, str, str]]) -> np.ndarray:
+    check_columns(df, [col for col, _, _ in filters])
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, value in filters:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) and op not in ("eq", "ne"):
+            # Ranges compare values, not category codes
+            series = series.astype(series.cat.categories.dtype)
+        mask &= np.asarray(FILTER_OPS[op](series, _typed(series, value)).fillna(False), dtype=bool)
+    return mask
+
+def sort_index(df: pd.DataFrame, column: str, descending: bool = False) -> np.ndarray:
+    """Row positions of df ordered by column (stable, missing values last)."""
+    check_columns(df, [column])
+    series = df[column].reset_index(drop=True)
+    if pd.api.types.is_numeric_dtype(series) and not series.hasnans:
+        values = series.to_numpy()
+        if not descending:
+            return np.argsort(values, kind="stable").astype(np.int64)
+        # Stable descending order: sort the reversed values and map the positions back
+        return (len(values) - 1 - np.argsort(values[::-1], kind="stable")[::-1]).astype(np.int64)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(series.cat.categories.dtype)
+    order = series.sort_values(ascending=not descending, kind="stable", na_position="last").index
+    return np.asarray(order, dtype=np.int64)
+
+def select(df: pd.DataFrame, order: Optional[np.ndarray], mask: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """Positions of the matching rows in display order (None means all rows in stored order)."""
+    if mask is None:
+        return order
+    if order is None:
+        return np.flatnonzero(mask)
+    return order[mask[order]]
+
+def page(df: pd.DataFrame, positions: Optional[np.ndarray], offset: int, limit: int,
+         columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, int]:
+    """The rows [offset, offset + limit) of the selection, projected to columns; returns (rows, total)."""
+    total = len(df) if positions is None else len(positions)
+    rows = slice(offset, offset + limit) if positions is None else positions[offset:offset + limit]
+    # Only the page's rows are taken, and only then projected
+    result = df.iloc[rows]
+    return (result if columns is None else result[columns]), total
@@ -0,0 +1,46 @@
+import pandas as pd
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from backend.app import database
+from backend.app.main import app
+from backend.app.services import alerts, ingest, kpis
+
+def test_thresholds_evaluated_in_one_kpi_pass(monkeypatch):
+    calls = []
+    summary = kpis.KPISummary(period_days=30, generated_at=datetime.now(), kpis=[
+        kpis._revenue_kpi(30, 500.0, 250.0), kpis._customers_kpi(30, 3, 3)])
+    monkeypatch.setattr(kpis, "compute_kpis", lambda **kwargs: calls.append(kwargs) or summary)
+
+    values = alerts.kpi_values()
+    thresholds = pd.DataFrame({
+        "id": [str(i) for i in range(3000)],
+        "kpi_name": ["revenue", "revenue.change_pct", "unknown"] * 1000,
+        "operator": [">", "<", ">"] * 1000,
+        "value": [400.0, 50.0, 0.0] * 1000,
+    })
+    fired = alerts.evaluate(values, thresholds)
+
+    assert len(calls) == 1
+    assert set(fired["kpi_name"]) == {"revenue"} and len(fired) == 1000
+    assert (fired["kpi_value"] == 500.0).all()
+
+def test_import_records_alerts(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app.db"))
+    monkeypatch.setattr(ingest, "DATA_DIR", str(tmp_path / "data"))
+    database.init_db()
+    client = TestClient(app)
+    assert client.post("/api/thresholds", json={"kpi_name": "revenue", "operator": ">", "value": 100}).status_code == 201
+    assert client.post("/api/thresholds", json={"kpi_name": "revenue", "operator": "~", "value": 1}).status_code == 400
+
+    recent = (datetime.now() - timedelta(days=1)).date().isoformat()
+    csv = tmp_path / "upload.csv"
+    csv.write_text(f"date,user_id,amount,source\n{recent},1,80,bank\n{recent},2,70,bank\n")
+    job_id = ingest.process_upload_file(str(csv), "upload.csv")
+
+    fired = client.get("/api/alerts").json()
+    assert [(a["import_id"], a["kpi_name"], a["value"]) for a in fired] == [(job_id, "revenue", 150.0)]
+
+    # Rows older than both KPI windows cannot move a KPI, so nothing is re-evaluated
+    csv.write_text("date,user_id,amount,source\n2001-01-01,3,999,bank\n")
+    ingest.process_upload_file(str(csv), "old.csv")
+    assert len(client.get("/api/alerts").json()) == 1
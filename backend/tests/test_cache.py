@@ -0,0 +1,30 @@
+from fastapi.testclient import TestClient
+from backend import analysis, cache
+from backend.cache import ResultCache
+from backend.main import app
+
+def test_result_cache_evicts_least_recently_used():
+    results = ResultCache(max_entries=2)
+    results.get_or_compute(("a", 1), lambda: "a")
+    results.get_or_compute(("b", 1), lambda: "b")
+    results.get_or_compute(("a", 1), lambda: "recomputed")
+    results.get_or_compute(("c", 1), lambda: "c")
+
+    assert results.get_or_compute(("a", 1), lambda: "recomputed") == "a"
+    assert results.get_or_compute(("b", 1), lambda: "recomputed") == "recomputed"
+    stats = results.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 4, 2)
+
+def test_dataset_endpoints_cached_until_reload():
+    client = TestClient(app)
+    csv = b"impressions,clicks,conversions,cost\n1000,10,1,5.0\n2000,40,4,12.5"
+    analysis.load_dataset("ads", csv)
+    before = cache.results.stats()
+
+    first = client.get("/data/ads/kpis").json()
+    assert client.get("/data/ads/kpis").json() == first
+    after = cache.results.stats()
+    assert (after["misses"] - before["misses"], after["hits"] - before["hits"]) == (1, 1)
+
+    analysis.load_dataset("ads", b"impressions,clicks,conversions,cost\n500,5,1,1.0")
+    assert client.get("/data/ads/kpis").json()["total_impressions"] == 500
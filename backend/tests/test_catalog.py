@@ -0,0 +1,28 @@
+from datetime import datetime
+from backend.app import database
+from backend.app.database import init_db
+from backend.app.services import catalog, ingest
+
+def test_scan_prunes_partitions_and_columns(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app.db"))
+    monkeypatch.setattr(ingest, "DATA_DIR", str(tmp_path / "data"))
+    init_db()
+
+    ingest.process_upload(b"date,user_id,amount,source\n2025-01-05,1,10,bank\n2025-01-20,2,20,bank\n2025-03-02,1,30,bank\n2025-03-03,3,5,ads", "a.csv")
+    ingest.process_upload(b"date,user_id,amount,source\n2025-03-10,4,40,bank\nnot-a-date,5,50,bank", "b.csv")
+
+    files = catalog.list_files()
+    assert sorted((f["source"], f["month"], f["row_count"]) for f in files) == [
+        ("ads", "2025-03", 1), ("bank", "2025-01", 2), ("bank", "2025-03", 1), ("bank", "2025-03", 1)
+    ]
+
+    start, end = datetime(2025, 3, 1), datetime(2025, 3, 31)
+    assert {f["month"] for f in catalog.list_files(start, end)} == {"2025-03"}
+    assert len(catalog.list_files(start, end, sources=["bank"])) == 2
+
+    df = catalog.scan(start, end, columns=["date", "amount"])
+    assert list(df.columns) == ["date", "amount"]
+    assert sorted(df["amount"].tolist()) == [5, 30, 40]
+
+    # Rows outside the range are filtered even inside an overlapping file
+    assert catalog.scan(datetime(2025, 1, 10), datetime(2025, 1, 31))["amount"].tolist() == [20]
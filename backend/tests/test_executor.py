@@ -0,0 +1,40 @@
+import asyncio
+import threading
+import pytest
+from fastapi.testclient import TestClient
+from backend import analysis, executor
+from backend.main import app
+
+def test_rejects_beyond_queue_limit_and_times_out():
+    pool = executor.BoundedExecutor(kind="thread", workers=1, queue_limit=1, timeout=0.05)
+    release = threading.Event()
+    running = [pool.submit(release.wait), pool.submit(release.wait)]
+    with pytest.raises(executor.Saturated):
+        pool.submit(release.wait)
+
+    release.set()
+    for future in running:
+        future.result(timeout=5)
+
+    blocker = threading.Event()
+    with pytest.raises(executor.TimedOut):
+        asyncio.run(pool.run(blocker.wait))
+    # The abandoned call keeps its slot until it actually finishes
+    assert pool.stats()["in_flight"] == 1
+    blocker.set()
+    pool.shutdown()
+    assert pool.stats()["in_flight"] == 0 and pool.stats()["timeouts"] == 1
+
+def test_saturated_endpoint_returns_503(monkeypatch):
+    analysis.load_dataset("ads", b"impressions,clicks,conversions,cost\n1000,10,1,5.0\n2000,40,4,12.5")
+    pool = executor.BoundedExecutor(kind="thread", workers=1, queue_limit=0)
+    monkeypatch.setattr(executor, "pool", pool)
+    release = threading.Event()
+    busy = pool.submit(release.wait)
+
+    response = TestClient(app).get("/data/ads/table")
+    assert response.status_code == 503 and response.headers["Retry-After"] == str(pool.retry_after)
+    release.set()
+    busy.result(timeout=5)
+    assert TestClient(app).get("/data/ads/table").status_code == 200
+    pool.shutdown()
@@ -0,0 +1,27 @@
+import time
+from fastapi.testclient import TestClient
+from backend.app import database
+from backend.app.main import app
+from backend.app.services import ingest
+
+def test_upload_is_queued_and_pollable(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app.db"))
+    monkeypatch.setattr(ingest, "DATA_DIR", str(tmp_path / "data"))
+
+    with TestClient(app) as client:
+        csv = b"date,user_id,amount,source\n2025-01-01,1,100,bank\n2025-01-02,2,50,bank"
+        response = client.post("/api/upload", files={"file": ("test.csv", csv)})
+        assert response.status_code == 202
+        job = response.json()
+        assert job["status"] in ("queued", "processing", "completed")
+
+        for _ in range(100):
+            job = client.get(f"/api/imports/{job['id']}").json()
+            if job["status"] not in ("queued", "processing"):
+                break
+            time.sleep(0.05)
+
+        assert job["status"] == "completed"
+        assert job["rows_processed"] == 2
+        assert [j["id"] for j in client.get("/api/imports").json()] == [job["id"]]
+        assert client.get("/api/imports/missing").status_code == 404
@@ -17,5 +17,43 @@ def test_ingest_flow():
     assert row['rows_processed'] == 1
     
     # Cleanup
-    if os.path.exists(f"backend/data/{job_id}.parquet"):
-        os.remove(f"backend/data/{job_id}.parquet")
+    for entry in conn.execute("SELECT path FROM dataset_files WHERE import_id=?", (job_id,)).fetchall():
+        os.remove(entry['path'])
+    conn.execute("DELETE FROM dataset_files WHERE import_id=?", (job_id,))
+    conn.commit()
+
+def test_ingest_streams_chunks_to_row_groups(tmp_path, monkeypatch):
+    import pyarrow.parquet as pq
+    from backend.app import database
+    from backend.app.services import ingest
+
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app.db"))
+    monkeypatch.setattr(ingest, "DATA_DIR", str(tmp_path / "data"))
+    init_db()
+
+    csv_path = tmp_path / "upload.csv"
+    csv_path.write_text("date,user_id,amount,source\n" + "".join(f"2025-01-0{i},{i},{i * 10},bank\n" for i in range(1, 6)))
+    job_id = ingest.process_upload_file(str(csv_path), "upload.csv", chunk_rows=2)
+
+    row = get_db().execute("SELECT * FROM imports WHERE id=?", (job_id,)).fetchone()
+    assert row['status'] == 'completed'
+    assert row['rows_processed'] == 5
+
+    parquet = pq.ParquetFile(tmp_path / "data" / "dataset" / "source=bank" / "month=2025-01" / f"{job_id}.parquet")
+    assert parquet.metadata.num_row_groups == 3
+    assert parquet.metadata.num_rows == 5
+
+def test_ingest_rejects_missing_columns(tmp_path, monkeypatch):
+    from backend.app import database
+    from backend.app.services import ingest
+
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "app.db"))
+    monkeypatch.setattr(ingest, "DATA_DIR", str(tmp_path / "data"))
+    init_db()
+
+    job_id = process_upload(b"date,amount\n2025-01-01,100\n2025-01-02,200", "bad.csv")
+
+    row = get_db().execute("SELECT * FROM imports WHERE id=?", (job_id,)).fetchone()
+    assert row['status'] == 'failed'
+    assert row['rows_errored'] == 2
+    assert "user_id" in json.loads(row['errors'])[0]
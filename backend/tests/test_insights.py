@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+from backend import insights
+from backend.app import database
+
+def _ads_frame(rows=500):
+    rng = np.random.default_rng(3)
+    return pd.DataFrame({
+        "impressions": rng.integers(1000, 5000, rows),
+        "clicks": rng.integers(10, 200, rows),
+        "conversions": rng.integers(0, 20, rows),
+        "cost": rng.uniform(10, 500, rows),
+    })
+
+def test_builtin_rules_match_hand_written_checks():
+    df = _ads_frame()
+    high_cost = df[df["cost"] > df["cost"].quantile(0.75)]
+    low_conv = high_cost[high_cost["conversions"] < high_cost["conversions"].quantile(0.25)]
+    ctr = (df["clicks"] / df["impressions"]).mean()
+
+    result = insights.generate(df, insights.BUILTIN_RULES["ads"])
+    assert [r["category"] for r in result] == (["Optimization"] if not low_conv.empty else []) + ["Performance"]
+    assert result[-1]["insight"] == f"Average CTR is {ctr:.2%}. Campaigns below this need optimization."
+
+def test_metric_thresholds_and_missing_columns():
+    df = _ads_frame()
+    rules = [
+        {"category": "A", "metric": "mean(cost)", "operator": ">", "threshold": 0, "impact": "Low", "insight": "{value:.1f}"},
+        {"category": "B", "metric": "sum(cost | cost > mean(cost))", "operator": ">", "threshold": "mean(cost)",
+         "impact": "Low", "insight": "{value:.1f}"},
+        {"category": "C", "metric": "mean(revenue)", "impact": "Low", "insight": "{value}"},
+    ]
+    result = insights.generate(df, rules)
+
+    assert [r["category"] for r in result] == ["A", "B"]
+    assert result[1]["insight"] == f"{df.loc[df['cost'] > df['cost'].mean(), 'cost'].sum():.1f}"
+
+def test_threshold_rows_become_rules(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "test.db"))
+    database.init_db()
+    conn = database.get_db()
+    conn.executemany("INSERT INTO thresholds (id, kpi_name, operator, value) VALUES (?, ?, ?, ?)",
+                     [("t1", "ads:max(cost)", ">", 100), ("t2", "ads:mean(cost)", "<", 1), ("t3", "revenue", ">", 5)])
+    conn.commit()
+    conn.close()
+
+    rules = insights.rules_for("ads")
+    assert [rule["metric"] for rule in rules[len(insights.BUILTIN_RULES["ads"]):]] == ["max(cost)", "mean(cost)"]
+    alerts = [r for r in insights.generate(_ads_frame(), rules) if r["category"] == "Alert"]
+    assert len(alerts) == 1 and alerts[0]["insight"].startswith("max(cost) is")
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from backend import analysis, profiles
+
+def _frame(rows=1000, seed=5):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "category": rng.choice(["Tech", "Music", "Sports"], rows),
+        "views": rng.integers(100, 100000, rows),
+        "likes": rng.integers(0, 500, rows),
+        "comments": rng.integers(0, 50, rows),
+        "cost": rng.uniform(0, 10, rows),
+    })
+    df.loc[::7, "cost"] = np.nan
+    return df
+
+def test_profile_merges_like_a_single_pass():
+    df = _frame()
+    whole = profiles.build(df, "youtube")
+    merged = profiles.build(df.iloc[:400], "youtube")
+    merged.merge(profiles.build(df.iloc[400:], "youtube"))
+    restored = profiles.DatasetProfile.from_dict(merged.to_dict())
+
+    for name in ["views", "cost", "engagement_rate"]:
+        a, b = whole.column(name), restored.column(name)
+        assert (a.count, a.nulls, a.min, a.max) == (b.count, b.nulls, b.min, b.max)
+        assert np.isclose(a.mean, b.mean) and np.isclose(a.std, b.std)
+    assert restored.column("category").top == whole.column("category").top
+    assert restored.missing_values() == df.isnull().sum().to_dict()
+
+def test_stats_and_kpis_served_from_profile():
+    df = _frame(rows=150)
+    analysis.load_dataset("youtube", df.to_csv(index=False).encode())
+    stats = analysis.get_summary_statistics("youtube")
+    kpis = analysis.calculate_kpis("youtube")
+
+    # Below the sketch capacity the percentiles are exact
+    expected = df.describe().to_dict()
+    assert stats.keys() == expected.keys()
+    for name in expected:
+        assert np.allclose(list(stats[name].values()), list(expected[name].values()), equal_nan=True)
+    assert kpis["total_views"] == int(df["views"].sum())
+    assert np.isclose(kpis["avg_engagement_rate"], ((df["likes"] + df["comments"]) / df["views"]).mean())
+    assert kpis["top_category"] == df["category"].mode()[0]
+
+def test_percentiles_endpoint():
+    from fastapi.testclient import TestClient
+    from backend.main import app
+
+    df = _frame(rows=150)
+    analysis.load_dataset("youtube", df.to_csv(index=False).encode())
+    client = TestClient(app)
+
+    body = client.get("/data/youtube/percentiles", params={"q": [0.1, 0.9], "column": "views"}).json()
+    assert body == {"views": {"values": {"0.1": df["views"].quantile(0.1), "0.9": df["views"].quantile(0.9)}, "rank_error": 0.0}}
+    assert client.get("/data/youtube/percentiles", params={"column": "category"}).status_code == 400
+    assert client.get("/data/youtube/percentiles", params={"q": 2}).status_code == 400
@@ -0,0 +1,80 @@
+import numpy as np
+from backend import segmentation
+
+def _blobs(rows_per_cluster=2000):
+    rng = np.random.default_rng(0)
+    centers = np.array([[0, 0, 0], [10, 10, 10], [0, 20, 5]])
+    return np.vstack([rng.normal(c, 1.0, size=(rows_per_cluster, 3)) for c in centers])
+
+def test_fast_segmentation_matches_exact(monkeypatch):
+    values = _blobs()
+    features = ["a", "b", "c"]
+    monkeypatch.setattr(segmentation, "FIT_SAMPLE_ROWS", 500)
+    monkeypatch.setattr(segmentation, "PCA_SAMPLE_ROWS", 500)
+
+    exact = segmentation.segment(values, features, 3, mode="exact")
+    fast = segmentation.segment(values, features, 3, mode="fast")
+
+    assert exact["mode"] == "exact" and fast["mode"] == "fast"
+    assert sorted(c["size"] for c in fast["clusters"]) == sorted(c["size"] for c in exact["clusters"]) == [2000] * 3
+    assert all(len(c["points"]) == segmentation.POINTS_PER_CLUSTER for c in fast["clusters"])
+
+def test_auto_mode_uses_row_threshold(monkeypatch):
+    monkeypatch.setattr(segmentation, "EXACT_MAX_ROWS", 100)
+    assert segmentation.resolve_mode("auto", 100) == "exact"
+    assert segmentation.resolve_mode("auto", 101) == "fast"
+
+def test_model_registry_reuses_fitted_pipeline(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from backend import analysis, model_registry
+    from backend.main import app
+
+    monkeypatch.setattr(model_registry, "MODEL_DIR", str(tmp_path))
+    analysis.load_dataset("youtube", open("data/youtube_data.csv", "rb").read())
+
+    fits = []
+    original_fit = segmentation.SegmentationPipeline.fit.__func__
+    monkeypatch.setattr(segmentation.SegmentationPipeline, "fit",
+                        classmethod(lambda cls, *args: fits.append(args) or original_fit(cls, *args)))
+
+    summary = analysis.perform_segmentation("youtube", 4)
+    client = TestClient(app)
+    single = client.post("/data/youtube/segmentation/assign?n_clusters=4",
+                         json={"views": 1000, "likes": 50, "watch_time_minutes": 3.5})
+    batch = client.post("/data/youtube/segmentation/assign?n_clusters=4",
+                        json=[{"views": 1000, "likes": 50, "watch_time_minutes": 3.5}, {"views": 5e7, "likes": 1e6, "watch_time_minutes": 9}])
+
+    assert len(fits) == 1
+    assert single.status_code == 200 and 0 <= single.json()["cluster_id"] < 4
+    assert len(batch.json()) == 2 and batch.json()[0] == single.json()
+    assert client.post("/data/youtube/segmentation/assign", json={"views": 1}).status_code == 400
+
+    # Another worker process (empty in-memory registry) loads the serialized model instead of refitting
+    model_registry.invalidate("youtube")
+    assert analysis.perform_segmentation("youtube", 4) == summary
+    assert len(fits) == 1
+
+def test_sweep_recommends_true_k():
+    result, pipeline = segmentation.sweep(_blobs(500), ["a", "b", "c"], k_min=2, k_max=5, mode="exact")
+
+    assert [r["k"] for r in result["results"]] == [2, 3, 4, 5]
+    assert result["recommended_k"] == 3 == pipeline.n_clusters
+    inertias = [r["inertia"] for r in result["results"]]
+    assert inertias == sorted(inertias, reverse=True)
+
+def test_summary_matches_per_cluster_scan():
+    values = _blobs(1000)
+    pipeline = segmentation.SegmentationPipeline.fit(values, ["a", "b", "c"], 5, mode="exact")
+    summary = pipeline.summarize(values)
+    labels, coords = pipeline.assign(values)
+
+    for cluster in summary["clusters"]:
+        members = labels == cluster["cluster_id"]
+        assert cluster["size"] == members.sum()
+        assert np.allclose(list(cluster["features"].values()), values[members].mean(axis=0))
+        member_coords = {(round(x, 9), round(y, 9)) for x, y in coords[members]}
+        points = {(round(p["x"], 9), round(p["y"], 9)) for p in cluster["points"]}
+        assert len(points) == min(cluster["size"], segmentation.POINTS_PER_CLUSTER)
+        assert points <= member_coords
+        # A uniform sample, not the first rows of the cluster
+        assert points != {(round(x, 9), round(y, 9)) for x, y in coords[members][:len(points)]}
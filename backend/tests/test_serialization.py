@@ -0,0 +1,54 @@
+import io
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from fastapi.testclient import TestClient
+from backend import analysis, serialization
+from backend.main import app
+
+ARROW = serialization.ARROW_MEDIA_TYPE
+COLUMNS = serialization.COLUMNS_MEDIA_TYPE
+
+def test_negotiate_prefers_highest_quality():
+    assert serialization.negotiate(None) == "json"
+    assert serialization.negotiate("text/html, */*") == "json"
+    assert serialization.negotiate(f"{COLUMNS};q=0.5, {ARROW}") == "arrow"
+    assert serialization.negotiate(f"{ARROW};q=0.2, {COLUMNS};q=0.9") == "columns"
+
+def test_preview_formats_carry_the_same_rows():
+    csv = b"impressions,clicks,conversions,cost,campaign_name\n1000,10,1,5.5,A\n2000,40,,12.5,B\n500,5,1,,C"
+    analysis.load_dataset("ads", csv)
+    client = TestClient(app)
+    records = client.get("/data/ads/preview?rows=3").json()
+
+    columnar = client.get("/data/ads/preview?rows=3", headers={"Accept": COLUMNS})
+    assert columnar.headers["content-type"] == COLUMNS
+    body = columnar.json()
+    assert [dict(zip(body["columns"], row)) for row in zip(*body["data"].values())] == records
+
+    arrow = client.get("/data/ads/preview?rows=3", headers={"Accept": ARROW})
+    table = pa.ipc.open_stream(io.BytesIO(arrow.content)).read_all()
+    assert table.to_pandas().replace({np.nan: None}).to_dict(orient="records") == records
+
+def test_segmentation_points_as_one_table():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({col: rng.integers(1, 1000, 400) for col in ["impressions", "clicks", "conversions"]})
+    df["cost"] = rng.uniform(1, 100, 400)
+    analysis.load_dataset("ads", df.to_csv(index=False).encode())
+    client = TestClient(app)
+    records = client.get("/data/ads/segmentation").json()
+
+    arrow = client.get("/data/ads/segmentation", headers={"Accept": ARROW})
+    table = pa.ipc.open_stream(io.BytesIO(arrow.content)).read_all()
+    points = table.to_pandas()
+    for cluster in records["clusters"]:
+        mine = points[points["cluster_id"] == cluster["cluster_id"]]
+        assert np.allclose(mine[["x", "y"]].to_numpy(), [[p["x"], p["y"]] for p in cluster["points"]])
+    summary = json.loads(table.schema.metadata[b"insightify"])
+    assert [c["size"] for c in summary["clusters"]] == [c["size"] for c in records["clusters"]]
+
+def test_dumps_without_orjson(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    payload = {"x": np.array([1.5, np.nan]), "n": np.array([1, 2]), "s": ["a", None]}
+    assert json.loads(serialization.dumps(payload)) == {"x": [1.5, None], "n": [1, 2], "s": ["a", None]}
@@ -0,0 +1,42 @@
+import numpy as np
+from backend.sketches import KLL, HyperLogLog
+
+def test_hyperloglog_merge_matches_union():
+    a = HyperLogLog.for_error(0.01)
+    a.add(np.arange(0, 60000))
+    b = HyperLogLog.for_error(0.01)
+    b.add(np.arange(40000, 100000))
+    a.merge(b)
+
+    assert abs(a.count() - 100000) <= 100000 * 3 * a.relative_error
+    restored = HyperLogLog.from_bytes(a.precision, a.to_bytes())
+    assert restored.count() == a.count()
+
+def test_hyperloglog_reduce_is_exact():
+    high = HyperLogLog(14)
+    high.add([f"user-{i}" for i in range(20000)])
+    low = HyperLogLog(10)
+    low.add([f"user-{i}" for i in range(20000)])
+
+    assert np.array_equal(high.reduce(10).registers, low.registers)
+
+def test_kll_merged_quantiles_within_rank_error():
+    values = np.random.default_rng(4).lognormal(size=200000)
+    a, b = KLL(), KLL()
+    for chunk in np.array_split(values[:120000], 12):
+        a.add(chunk)
+    b.add(values[120000:])
+    a.merge(b)
+
+    ordered = np.sort(values)
+    qs = [0.01, 0.25, 0.5, 0.75, 0.99]
+    ranks = np.searchsorted(ordered, a.quantiles(qs)) / len(values)
+    assert a.n == len(values) and sum(len(level) for level in a.levels) < 3 * a.k
+    assert np.abs(ranks - qs).max() <= 2 * a.rank_error
+    assert a.quantile(0) == values.min() and a.quantile(1) == values.max()
+    assert KLL.from_dict(a.to_dict()).quantile(0.5) == a.quantile(0.5)
+
+def test_kll_exact_until_first_compaction():
+    small = KLL(k=200)
+    small.add([5.0, 1.0, np.nan, 3.0, 2.0])
+    assert small.exact and small.quantile(0.25) == np.quantile([1.0, 2.0, 3.0, 5.0], 0.25)
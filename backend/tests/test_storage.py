@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from backend import analysis
+from backend.storage import compact_frame
+
+def test_compact_frame_is_lossless():
+    df = pd.DataFrame({
+        "category": ["Tech", "Vlog", "Tech", "Tech"],
+        "video_id": ["a", "b", "c", "d"],
+        "views": [10, 20, 30, 2_000_000],
+        "flag": [0, 1, 0, 1],
+        "cost": [1.5, 2.25, np.nan, 4.0],
+        "price": [12.34, 0.1, 3.0, 1.0],
+    })
+    compact = compact_frame(df)
+
+    assert isinstance(compact["category"].dtype, pd.CategoricalDtype)
+    assert not isinstance(compact["video_id"].dtype, pd.CategoricalDtype)
+    assert compact["views"].dtype == np.int32
+    assert compact["flag"].dtype == np.int8
+    assert compact["cost"].dtype == np.float32
+    assert compact["price"].dtype == np.float64
+    pd.testing.assert_frame_equal(compact.astype(df.dtypes.to_dict()), df)
+
+def test_load_dataset_reports_memory():
+    analysis.load_dataset("youtube", open("data/youtube_data.csv", "rb").read())
+    report = analysis.get_memory_report("youtube")
+    assert report["after_bytes"] < report["before_bytes"]
+    assert report["columns"]["category"]["dtype_after"] == "category"
+
+def test_dataset_store_spills_least_recently_used(tmp_path):
+    from backend.storage import DatasetStore
+
+    frames = {name: compact_frame(pd.DataFrame({"x": np.arange(1000) * i, "c": ["a", "b"] * 500}))
+              for i, name in enumerate(["one", "two", "three"], start=1)}
+    size = int(frames["one"].memory_usage(deep=True).sum())
+    store = DatasetStore(memory_budget_bytes=int(size * 2.5), spill_root=str(tmp_path), shared_dir=None)
+
+    for name, df in frames.items():
+        store[name] = df
+    assert store.stats()["in_memory"] == ["two@v1", "three@v1"]
+    assert store.stats()["spilled"] == ["one@v1"]
+
+    pd.testing.assert_frame_equal(store["one"], frames["one"])
+    assert store.stats()["in_memory"] == ["three@v1", "one@v1"]
+    assert store.loads == 1
+
+    store["three"] = frames["one"]
+    assert store.version("three") == 2
+    pd.testing.assert_frame_equal(store["three"], frames["one"])
+
+def test_dataset_store_shares_uploads_across_processes(tmp_path):
+    from backend.storage import DatasetStore
+
+    # Two stores over one directory stand in for two uvicorn workers
+    writer = DatasetStore(shared_dir=str(tmp_path))
+    reader = DatasetStore(shared_dir=str(tmp_path))
+    df = compact_frame(pd.DataFrame({"views": np.arange(100), "category": ["Tech", "Vlog"] * 50}))
+
+    assert "youtube" not in reader
+    writer.put("youtube", df, metadata={"rows": 100})
+    assert reader.version("youtube") == 1
+    shared = reader["youtube"]
+    pd.testing.assert_frame_equal(shared, df)
+    assert reader.metadata("youtube") == {"rows": 100}
+    # Numeric columns are views over the memory-mapped file rather than private copies
+    assert not shared["views"].to_numpy().flags.owndata
+
+    writer.put("youtube", df.head(10))
+    assert reader.version("youtube") == 2
+    assert len(reader["youtube"]) == 10
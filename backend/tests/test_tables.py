@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+from backend import analysis, tables
+from backend.main import app
+
+def _load(rows=1000):
+    rng = np.random.default_rng(9)
+    df = pd.DataFrame({
+        "category": rng.choice(["Tech", "Music", "Sports"], rows),
+        "views": rng.integers(0, 50, rows),
+        "cost": rng.uniform(0, 10, rows).round(2),
+    })
+    df.loc[::11, "cost"] = np.nan
+    analysis.load_dataset("youtube", df.to_csv(index=False).encode())
+    return df
+
+def test_pages_match_sorted_filtered_frame(monkeypatch):
+    df = _load()
+    calls = []
+    sort_index = tables.sort_index
+    monkeypatch.setattr(tables, "sort_index", lambda *args: calls.append(args[1:]) or sort_index(*args))
+
+    expected = df[(df["category"] == "Music") & (df["views"] >= 10)].sort_values("views", ascending=False, kind="stable")
+    collected, offset = [], 0
+    while offset is not None:
+        page = analysis.get_table_page("youtube", offset, 64, ["views", "cost"], "views", True,
+                                       ["category:eq:Music", "views:gte:10"])
+        collected.append(page["rows"])
+        offset = page["next_offset"]
+
+    result = pd.concat(collected)
+    assert page["total"] == len(expected)
+    assert result.index.tolist() == expected.index.tolist()
+    assert result.columns.tolist() == ["views", "cost"]
+    # The sort order is computed once per dataset version and reused by every page
+    assert calls == [("views", True)]
+
+def test_missing_values_sort_last_both_ways():
+    df = _load()
+    for descending in (False, True):
+        order = tables.sort_index(df, "cost", descending)
+        expected = df["cost"].sort_values(ascending=not descending, kind="stable", na_position="last").index
+        assert order.tolist() == expected.tolist()
+
+def test_table_endpoint():
+    _load(rows=30)
+    client = TestClient(app)
+    body = client.get("/data/youtube/table", params={"limit": 20, "sort": "views", "columns": ["views"]}).json()
+    assert body["total"] == 30 and body["next_offset"] == 20 and len(body["rows"]) == 20
+    assert [row["views"] for row in body["rows"]] == sorted(row["views"] for row in body["rows"])
+    assert client.get("/data/youtube/table", params={"filter": "views:between:1"}).status_code == 400
+    assert client.get("/data/youtube/table", params={"sort": "nope"}).status_code == 400